@@ -3,13 +3,240 @@
 Генерация графиков и HTML отчетов.
 """
 
-import json
+import os
 import argparse
+import base64
+import bisect
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # Для работы без GUI
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+
+# Параметры сохранения PNG: один рендер в буфер Agg и быстрое сжатие PIL.
+# 150 dpi вчетверо меньше пикселей, чем 300, и достаточно для HTML отчета.
+PLOT_DPI = 150
+PNG_COMPRESS_LEVEL = 1
+
+
+def _pyplot():
+    """
+    Импортировать matplotlib.pyplot при первом построении графика.
+    
+    Импорт matplotlib занимает сотни миллисекунд, поэтому модуль
+    не загружает его, если нужен только HTMLReporter.
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Для работы без GUI
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _image_libs():
+    """
+    Импортировать numpy и PIL.Image для записи PNG.
+    
+    Как и matplotlib, они нужны только при построении графиков.
+    """
+    import numpy as np
+    from PIL import Image
+    return np, Image
+
+
+# Начиная с этого размера ядру сообщается о последовательном чтении файла
+_FADVISE_MIN_SIZE = 16 * 1024 * 1024
+
+
+def _load_json(path: str) -> Dict:
+    """Загрузить JSON файл."""
+    with open(path, 'rb') as f:
+        fd = f.fileno()
+        if hasattr(os, 'posix_fadvise') and os.fstat(fd).st_size >= _FADVISE_MIN_SIZE:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        data = f.read()
+    return orjson.loads(data)
+
+
+def _metrics_by_tool(metrics: Dict) -> Dict:
+    """Метрики по инструментам без 'overall', отсортированные по имени."""
+    if not metrics:
+        return {}
+    return {tool: metrics[tool] for tool in sorted(metrics) if tool != 'overall'}
+
+
+# Метрики графика сравнения Text vs Audio и их подписи
+_COMPARISON_METRICS = ['precision', 'recall', 'f1', 'false_alarm_rate']
+_COMPARISON_NAMES = ['Precision', 'Recall', 'F1-Score', 'False Alarm Rate']
+# Общие метрики и их подписи
+_OVERALL_METRICS = ['accuracy', 'parsable_rate']
+_OVERALL_NAMES = ['Accuracy', 'Parsable Rate']
+
+# Фигура, переиспользуемая всеми графиками процесса
+_figure = None
+
+
+def _get_figure(figsize: tuple):
+    """Получить очищенную фигуру нужного размера."""
+    global _figure
+    if _figure is None:
+        _figure = _pyplot().figure(figsize=figsize)
+    else:
+        _figure.clear()
+        _figure.set_size_inches(figsize)
+    return _figure
+
+
+def _close_figure() -> None:
+    """Закрыть переиспользуемую фигуру."""
+    global _figure
+    if _figure is not None:
+        _pyplot().close(_figure)
+        _figure = None
+
+
+def _save_figure(fig, output_path: Path, dpi: int) -> None:
+    """Сохранить фигуру в PNG."""
+    np, Image = _image_libs()
+    fig.set_dpi(dpi)
+    fig.tight_layout()
+    
+    # Рендерим в RGBA буфер и пишем PNG через PIL, минуя savefig
+    fig.canvas.draw()
+    pixels = np.asarray(fig.canvas.buffer_rgba())
+    Image.fromarray(pixels).save(
+        output_path,
+        format='PNG',
+        compress_level=PNG_COMPRESS_LEVEL,
+        optimize=False
+    )
+
+
+# Функции отрисовки получают только данные своего графика: при построении
+# в отдельных процессах в них передаются списки значений, а не весь визуализатор
+
+def _render_metrics_comparison(
+    output_path: Path,
+    dpi: int,
+    figsize: tuple,
+    tools: List[str],
+    text_values: Dict[str, List[float]],
+    audio_values: Dict[str, List[float]]
+) -> None:
+    """Нарисовать сравнение метрик Text vs Audio."""
+    fig = _get_figure(figsize)
+    axes = fig.subplots(2, 2)
+    fig.suptitle('Сравнение метрик: Text vs Audio', fontsize=16, fontweight='bold')
+    
+    for idx, (metric, name) in enumerate(zip(_COMPARISON_METRICS, _COMPARISON_NAMES)):
+        ax = axes[idx // 2, idx % 2]
+        
+        x = range(len(tools))
+        width = 0.35
+        
+        ax.bar([i - width/2 for i in x], text_values[metric], width, label='Text', alpha=0.8)
+        ax.bar([i + width/2 for i in x], audio_values[metric], width, label='Audio', alpha=0.8)
+        
+        ax.set_xlabel('Инструмент')
+        ax.set_ylabel(name)
+        ax.set_title(name)
+        ax.set_xticks(x)
+        ax.set_xticklabels(tools, rotation=45, ha='right')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+    
+    _save_figure(fig, output_path, dpi)
+
+
+def _render_modality_gap(
+    output_path: Path,
+    dpi: int,
+    figsize: tuple,
+    tools: List[str],
+    gaps: Dict[str, List[float]]
+) -> None:
+    """Нарисовать разрыв модальностей по инструментам."""
+    fig = _get_figure(figsize)
+    ax = fig.subplots()
+    
+    x = range(len(tools))
+    width = 0.25
+    
+    ax.bar([i - width for i in x], gaps['precision_gap_abs'], width, label='Precision Gap', alpha=0.8)
+    ax.bar(x, gaps['recall_gap_abs'], width, label='Recall Gap', alpha=0.8)
+    ax.bar([i + width for i in x], gaps['f1_gap_abs'], width, label='F1 Gap', alpha=0.8)
+    
+    ax.set_xlabel('Инструмент')
+    ax.set_ylabel('Абсолютный разрыв')
+    ax.set_title('Разрыв модальностей по инструментам', fontsize=14, fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tools, rotation=45, ha='right')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    
+    _save_figure(fig, output_path, dpi)
+
+
+def _render_per_tool_performance(
+    output_path: Path,
+    dpi: int,
+    figsize: tuple,
+    tools: List[str],
+    values: Dict[str, List[float]]
+) -> None:
+    """Нарисовать производительность по инструментам."""
+    fig = _get_figure(figsize)
+    ax = fig.subplots()
+    
+    x = range(len(tools))
+    width = 0.25
+    
+    ax.bar([i - width for i in x], values['precision'], width, label='Precision', alpha=0.8)
+    ax.bar(x, values['recall'], width, label='Recall', alpha=0.8)
+    ax.bar([i + width for i in x], values['f1'], width, label='F1-Score', alpha=0.8)
+    
+    ax.set_xlabel('Инструмент')
+    ax.set_ylabel('Значение метрики')
+    ax.set_title('Производительность по инструментам (Text)', fontsize=14, fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(tools, rotation=45, ha='right')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.set_ylim([0, 1.1])
+    
+    _save_figure(fig, output_path, dpi)
+
+
+def _render_overall_comparison(
+    output_path: Path,
+    dpi: int,
+    figsize: tuple,
+    text_values: List[float],
+    audio_values: List[float]
+) -> None:
+    """Нарисовать общее сравнение Text vs Audio."""
+    fig = _get_figure(figsize)
+    ax = fig.subplots()
+    
+    x = range(len(_OVERALL_METRICS))
+    width = 0.35
+    
+    ax.bar([i - width/2 for i in x], text_values, width, label='Text', alpha=0.8)
+    ax.bar([i + width/2 for i in x], audio_values, width, label='Audio', alpha=0.8)
+    
+    ax.set_ylabel('Значение')
+    ax.set_title('Общие метрики: Text vs Audio', fontsize=14, fontweight='bold')
+    ax.set_xticks(x)
+    ax.set_xticklabels(_OVERALL_NAMES)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.set_ylim([0, 1.1])
+    
+    _save_figure(fig, output_path, dpi)
+
+
+# Задание на построение графика: функция отрисовки, её аргументы и сообщение
+PlotJob = Tuple[Callable[..., None], Dict[str, Any], str]
 
 
 # ANCHOR:visualizer
@@ -21,7 +248,8 @@ class ResultsVisualizer:
         text_metrics_path: str,
         audio_metrics_path: str = None,
         gap_metrics_path: str = None,
-        output_dir: str = "data/results/plots"
+        output_dir: str = "data/results/plots",
+        dpi: int = PLOT_DPI
     ):
         """
         Инициализация визуализатора.
@@ -31,229 +259,228 @@ class ResultsVisualizer:
             audio_metrics_path: Путь к метрикам на аудио.
             gap_metrics_path: Путь к метрикам разрыва.
             output_dir: Директория для сохранения графиков.
+            dpi: Разрешение графиков (больше - качественнее, но медленнее).
         """
         self.output_dir = Path(output_dir)
+        self.dpi = dpi
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Загружаем метрики
-        with open(text_metrics_path, 'r', encoding='utf-8') as f:
-            self.text_metrics = json.load(f)
-        
-        self.audio_metrics = None
-        if audio_metrics_path and Path(audio_metrics_path).exists():
-            with open(audio_metrics_path, 'r', encoding='utf-8') as f:
-                self.audio_metrics = json.load(f)
-        
-        self.gap_metrics = None
-        if gap_metrics_path and Path(gap_metrics_path).exists():
-            with open(gap_metrics_path, 'r', encoding='utf-8') as f:
-                self.gap_metrics = json.load(f)
-    
-    def plot_metrics_comparison(self) -> None:
-        """Построить сравнение метрик Text vs Audio."""
-        if not self.audio_metrics:
-            print("⚠️  Метрики на аудио не найдены, пропускаем сравнение")
-            return
-        
-        # Получаем инструменты
-        tools = [k for k in self.text_metrics.keys() if k != "overall"]
-        
-        # Метрики для сравнения
-        metrics_to_plot = ['precision', 'recall', 'f1', 'false_alarm_rate']
-        metric_names = ['Precision', 'Recall', 'F1-Score', 'False Alarm Rate']
-        
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        fig.suptitle('Сравнение метрик: Text vs Audio', fontsize=16, fontweight='bold')
-        
-        for idx, (metric, name) in enumerate(zip(metrics_to_plot, metric_names)):
-            ax = axes[idx // 2, idx % 2]
+        # Загружаем метрики (файлы независимы, читаем параллельно)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            text_future = executor.submit(_load_json, text_metrics_path)
             
-            text_values = [self.text_metrics.get(tool, {}).get(metric, 0) for tool in tools]
-            audio_values = [self.audio_metrics.get(tool, {}).get(metric, 0) for tool in tools]
+            audio_future = None
+            if audio_metrics_path and Path(audio_metrics_path).exists():
+                audio_future = executor.submit(_load_json, audio_metrics_path)
             
-            x = range(len(tools))
-            width = 0.35
+            gap_future = None
+            if gap_metrics_path and Path(gap_metrics_path).exists():
+                gap_future = executor.submit(_load_json, gap_metrics_path)
             
-            ax.bar([i - width/2 for i in x], text_values, width, label='Text', alpha=0.8)
-            ax.bar([i + width/2 for i in x], audio_values, width, label='Audio', alpha=0.8)
-            
-            ax.set_xlabel('Инструмент')
-            ax.set_ylabel(name)
-            ax.set_title(name)
-            ax.set_xticks(x)
-            ax.set_xticklabels(tools, rotation=45, ha='right')
-            ax.legend()
-            ax.grid(True, alpha=0.3)
+            self.text_metrics = text_future.result()
+            self.audio_metrics = audio_future.result() if audio_future else None
+            self.gap_metrics = gap_future.result() if gap_future else None
         
-        plt.tight_layout()
-        output_path = self.output_dir / 'metrics_comparison.png'
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
+        # Списки инструментов считаются один раз для всех графиков
+        self._text_tools = list(_metrics_by_tool(self.text_metrics))
+        self._gap_tools = list(_metrics_by_tool(self.gap_metrics))
+    
+    @staticmethod
+    def _extract_metrics(
+        source: Dict,
+        tools: List[str],
+        metrics: List[str]
+    ) -> Dict[str, List[float]]:
+        """
+        Извлечь значения нескольких метрик за один проход по инструментам.
         
-        print(f"✓ График сравнения метрик: {output_path}")
+        Args:
+            source: Метрики по инструментам.
+            tools: Инструменты (порядок сохраняется).
+            metrics: Названия метрик.
+            
+        Returns:
+            Словарь метрика -> список значений по инструментам.
+        """
+        values = {metric: [] for metric in metrics}
+        for tool in tools:
+            tool_metrics = source.get(tool) or {}
+            for metric in metrics:
+                values[metric].append(tool_metrics.get(metric, 0))
+        return values
     
-    def plot_modality_gap(self) -> None:
-        """Построить график разрыва модальностей."""
+    @staticmethod
+    def _tools_width(
+        tools: List[str],
+        max_width: float = 12,
+        columns: int = 1
+    ) -> float:
+        """Ширина графика по инструментам: меньше инструментов - уже график."""
+        return min(max_width, 4 + columns * len(tools))
+    
+    def _job_kwargs(self, file_name: str, figsize: tuple) -> Dict[str, Any]:
+        """Общие аргументы функций отрисовки."""
+        return {
+            'output_path': self.output_dir / file_name,
+            'dpi': self.dpi,
+            'figsize': figsize
+        }
+    
+    def _metrics_comparison_job(self) -> Optional[PlotJob]:
+        """Подготовить данные сравнения метрик Text vs Audio."""
+        if not self.audio_metrics:
+            print("⚠️  Метрики на аудио не найдены, пропускаем сравнение")
+            return None
+        
+        tools = self._text_tools
+        kwargs = self._job_kwargs(
+            'metrics_comparison.png', (self._tools_width(tools, 15, columns=2), 12)
+        )
+        kwargs.update(
+            tools=tools,
+            text_values=self._extract_metrics(self.text_metrics, tools, _COMPARISON_METRICS),
+            audio_values=self._extract_metrics(self.audio_metrics, tools, _COMPARISON_METRICS)
+        )
+        return (
+            _render_metrics_comparison,
+            kwargs,
+            f"✓ График сравнения метрик: {kwargs['output_path']}"
+        )
+    
+    def _modality_gap_job(self) -> Optional[PlotJob]:
+        """Подготовить данные разрыва модальностей."""
         if not self.gap_metrics:
             print("⚠️  Метрики разрыва не найдены, пропускаем")
-            return
-        
-        tools = [k for k in self.gap_metrics.keys() if k != "overall"]
+            return None
         
+        tools = self._gap_tools
+        kwargs = self._job_kwargs('modality_gap.png', (self._tools_width(tools), 6))
         # Абсолютные разрывы
-        precision_gaps = [self.gap_metrics.get(tool, {}).get('precision_gap_abs', 0) for tool in tools]
-        recall_gaps = [self.gap_metrics.get(tool, {}).get('recall_gap_abs', 0) for tool in tools]
-        f1_gaps = [self.gap_metrics.get(tool, {}).get('f1_gap_abs', 0) for tool in tools]
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        x = range(len(tools))
-        width = 0.25
-        
-        ax.bar([i - width for i in x], precision_gaps, width, label='Precision Gap', alpha=0.8)
-        ax.bar(x, recall_gaps, width, label='Recall Gap', alpha=0.8)
-        ax.bar([i + width for i in x], f1_gaps, width, label='F1 Gap', alpha=0.8)
-        
-        ax.set_xlabel('Инструмент')
-        ax.set_ylabel('Абсолютный разрыв')
-        ax.set_title('Разрыв модальностей по инструментам', fontsize=14, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(tools, rotation=45, ha='right')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        output_path = self.output_dir / 'modality_gap.png'
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"✓ График разрыва модальностей: {output_path}")
+        kwargs.update(
+            tools=tools,
+            gaps=self._extract_metrics(
+                self.gap_metrics, tools, ['precision_gap_abs', 'recall_gap_abs', 'f1_gap_abs']
+            )
+        )
+        return (
+            _render_modality_gap,
+            kwargs,
+            f"✓ График разрыва модальностей: {kwargs['output_path']}"
+        )
     
-    def plot_per_tool_performance(self) -> None:
-        """Построить график производительности по инструментам."""
-        tools = [k for k in self.text_metrics.keys() if k != "overall"]
-        
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        precision = [self.text_metrics.get(tool, {}).get('precision', 0) for tool in tools]
-        recall = [self.text_metrics.get(tool, {}).get('recall', 0) for tool in tools]
-        f1 = [self.text_metrics.get(tool, {}).get('f1', 0) for tool in tools]
-        
-        x = range(len(tools))
-        width = 0.25
-        
-        ax.bar([i - width for i in x], precision, width, label='Precision', alpha=0.8)
-        ax.bar(x, recall, width, label='Recall', alpha=0.8)
-        ax.bar([i + width for i in x], f1, width, label='F1-Score', alpha=0.8)
-        
-        ax.set_xlabel('Инструмент')
-        ax.set_ylabel('Значение метрики')
-        ax.set_title('Производительность по инструментам (Text)', fontsize=14, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(tools, rotation=45, ha='right')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        ax.set_ylim([0, 1.1])
-        
-        plt.tight_layout()
-        output_path = self.output_dir / 'per_tool_performance.png'
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"✓ График производительности: {output_path}")
+    def _per_tool_performance_job(self) -> Optional[PlotJob]:
+        """Подготовить данные производительности по инструментам."""
+        tools = self._text_tools
+        kwargs = self._job_kwargs('per_tool_performance.png', (self._tools_width(tools), 6))
+        kwargs.update(
+            tools=tools,
+            values=self._extract_metrics(self.text_metrics, tools, ['precision', 'recall', 'f1'])
+        )
+        return (
+            _render_per_tool_performance,
+            kwargs,
+            f"✓ График производительности: {kwargs['output_path']}"
+        )
     
-    def plot_overall_comparison(self) -> None:
-        """Построить общее сравнение."""
+    def _overall_comparison_job(self) -> Optional[PlotJob]:
+        """Подготовить данные общего сравнения."""
         if not self.audio_metrics:
-            return
+            return None
         
         text_overall = self.text_metrics.get('overall', {})
         audio_overall = self.audio_metrics.get('overall', {})
         
-        metrics = ['accuracy', 'parsable_rate']
-        metric_names = ['Accuracy', 'Parsable Rate']
-        
-        text_values = [text_overall.get(m, 0) for m in metrics]
-        audio_values = [audio_overall.get(m, 0) for m in metrics]
-        
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        x = range(len(metrics))
-        width = 0.35
-        
-        ax.bar([i - width/2 for i in x], text_values, width, label='Text', alpha=0.8)
-        ax.bar([i + width/2 for i in x], audio_values, width, label='Audio', alpha=0.8)
-        
-        ax.set_ylabel('Значение')
-        ax.set_title('Общие метрики: Text vs Audio', fontsize=14, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(metric_names)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        ax.set_ylim([0, 1.1])
-        
-        plt.tight_layout()
-        output_path = self.output_dir / 'overall_comparison.png'
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        print(f"✓ График общего сравнения: {output_path}")
+        kwargs = self._job_kwargs('overall_comparison.png', (8, 6))
+        kwargs.update(
+            text_values=[text_overall.get(m, 0) for m in _OVERALL_METRICS],
+            audio_values=[audio_overall.get(m, 0) for m in _OVERALL_METRICS]
+        )
+        return (
+            _render_overall_comparison,
+            kwargs,
+            f"✓ График общего сравнения: {kwargs['output_path']}"
+        )
     
-    def generate_all_plots(self) -> None:
-        """Сгенерировать все графики."""
-        print("Генерация графиков...")
-        
-        self.plot_per_tool_performance()
-        self.plot_metrics_comparison()
-        self.plot_modality_gap()
-        self.plot_overall_comparison()
-        
-        print(f"\n✓ Все графики сохранены в {self.output_dir}")
-# END:visualizer
-
-
-# ANCHOR:html_reporter
-class HTMLReporter:
-    """Генератор HTML отчетов."""
+    @staticmethod
+    def _run_job(job: Optional[PlotJob]) -> None:
+        """Построить график в текущем процессе."""
+        if job is None:
+            return
+        render, kwargs, message = job
+        render(**kwargs)
+        _close_figure()
+        print(message)
     
-    def __init__(
-        self,
-        text_metrics: Dict,
-        audio_metrics: Dict = None,
-        gap_metrics: Dict = None,
-        plots_dir: Path = None
-    ):
-        """
-        Инициализация генератора отчетов.
-        
-        Args:
-            text_metrics: Метрики на тексте.
-            audio_metrics: Метрики на аудио.
-            gap_metrics: Метрики разрыва.
-            plots_dir: Директория с графиками.
-        """
-        self.text_metrics = text_metrics
-        self.audio_metrics = audio_metrics
-        self.gap_metrics = gap_metrics
-        self.plots_dir = plots_dir
+    def plot_metrics_comparison(self) -> None:
+        """Построить сравнение метрик Text vs Audio."""
+        self._run_job(self._metrics_comparison_job())
     
-    def generate_report(self, output_path: str) -> None:
+    def plot_modality_gap(self) -> None:
+        """Построить график разрыва модальностей."""
+        self._run_job(self._modality_gap_job())
+    
+    def plot_per_tool_performance(self) -> None:
+        """Построить график производительности по инструментам."""
+        self._run_job(self._per_tool_performance_job())
+    
+    def plot_overall_comparison(self) -> None:
+        """Построить общее сравнение."""
+        self._run_job(self._overall_comparison_job())
+    
+    def generate_all_plots(self, workers: int = 4) -> None:
         """
-        Сгенерировать HTML отчет.
+        Сгенерировать все графики.
         
         Args:
-            output_path: Путь для сохранения отчета.
+            workers: Количество процессов для построения графиков
+                (1 - последовательно в текущем процессе).
         """
-        html = self._generate_html()
+        print("Генерация графиков...")
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        jobs = [
+            job for job in (
+                self._per_tool_performance_job(),
+                self._metrics_comparison_job(),
+                self._modality_gap_job(),
+                self._overall_comparison_job(),
+            )
+            if job is not None
+        ]
+        
+        if workers > 1 and len(jobs) > 1:
+            # matplotlib не потокобезопасен, поэтому каждый график строится
+            # в своём процессе; процессам передаются только данные графика,
+            # а о готовности сообщает родительский процесс
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                futures = [
+                    (executor.submit(_render_job, render, kwargs), message)
+                    for render, kwargs, message in jobs
+                ]
+                for future, message in futures:
+                    future.result()
+                    print(message)
+        else:
+            for render, kwargs, message in jobs:
+                render(**kwargs)
+                print(message)
+            _close_figure()
         
-        print(f"✓ HTML отчет: {output_path}")
-    
-    def _generate_html(self) -> str:
-        """Сгенерировать HTML код."""
-        html = """
+        print(f"\n✓ Все графики сохранены в {self.output_dir}")
+
+
+def _render_job(render: Callable[..., None], kwargs: Dict[str, Any]) -> None:
+    """Построить один график (выполняется в отдельном процессе)."""
+    render(**kwargs)
+    _close_figure()
+# END:visualizer
+
+
+# Пороги CSS классов метрик: < 0.7 - bad, < 0.9 - warning, иначе good
+_METRIC_THRESHOLDS = (0.7, 0.9)
+_METRIC_CLASSES = ("bad", "warning", "good")
+
+# Неизменяемые части HTML отчета
+_HTML_HEADER = """
 <!DOCTYPE html>
 <html lang="ru">
 <head>
@@ -344,10 +571,81 @@ class HTMLReporter:
     <div class="summary">
         <h2>Краткая сводка</h2>
 """
+
+_HTML_FOOTER = """
+</body>
+</html>
+"""
+
+_TABLE_HEADER = """
+    <div class="metric-card">
+        <table>
+            <tr>
+                <th>Инструмент</th>
+                <th>Precision</th>
+                <th>Recall</th>
+                <th>F1-Score</th>
+                <th>FAR</th>
+            </tr>
+"""
+
+_TABLE_FOOTER = """
+        </table>
+    </div>
+"""
+
+
+# ANCHOR:html_reporter
+class HTMLReporter:
+    """Генератор HTML отчетов."""
+    
+    def __init__(
+        self,
+        text_metrics: Dict,
+        audio_metrics: Dict = None,
+        gap_metrics: Dict = None,
+        plots_dir: Path = None,
+        inline_images: bool = False
+    ):
+        """
+        Инициализация генератора отчетов.
+        
+        Args:
+            text_metrics: Метрики на тексте.
+            audio_metrics: Метрики на аудио.
+            gap_metrics: Метрики разрыва.
+            plots_dir: Директория с графиками.
+            inline_images: Встраивать графики в HTML как data URI
+                (отчет не зависит от файлов в plots_dir).
+        """
+        self.text_metrics = text_metrics
+        self.audio_metrics = audio_metrics
+        self.gap_metrics = gap_metrics
+        self.plots_dir = plots_dir
+        self.inline_images = inline_images
+        self._text_by_tool = _metrics_by_tool(text_metrics)
+        self._audio_by_tool = _metrics_by_tool(audio_metrics)
+    
+    def generate_report(self, output_path: str) -> None:
+        """
+        Сгенерировать HTML отчет.
+        
+        Args:
+            output_path: Путь для сохранения отчета.
+        """
+        # Пишем отчет по частям, не собирая его целиком в памяти
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(self._iter_html())
+        
+        print(f"✓ HTML отчет: {output_path}")
+    
+    def _iter_html(self) -> Iterator[str]:
+        """Сгенерировать HTML код по частям."""
+        yield _HTML_HEADER
         
         # Добавляем общие метрики
         text_overall = self.text_metrics.get('overall', {})
-        html += f"""
+        yield f"""
         <p><strong>Общая точность (Text):</strong> {text_overall.get('accuracy', 0):.2%}</p>
         <p><strong>Parsable Rate (Text):</strong> {text_overall.get('parsable_rate', 0):.2%}</p>
         <p><strong>Всего примеров:</strong> {text_overall.get('total_samples', 0)}</p>
@@ -355,25 +653,25 @@ class HTMLReporter:
         
         if self.audio_metrics:
             audio_overall = self.audio_metrics.get('overall', {})
-            html += f"""
+            yield f"""
         <p><strong>Общая точность (Audio):</strong> {audio_overall.get('accuracy', 0):.2%}</p>
         <p><strong>Parsable Rate (Audio):</strong> {audio_overall.get('parsable_rate', 0):.2%}</p>
 """
         
         if self.gap_metrics:
             gap_overall = self.gap_metrics.get('overall', {})
-            html += f"""
+            yield f"""
         <p><strong>Tool Agreement Rate:</strong> {gap_overall.get('tool_agreement_rate', 0):.2%}</p>
         <p><strong>Degradation Rate:</strong> {gap_overall.get('degradation_rate', 0):.2%}</p>
 """
         
-        html += """
+        yield """
     </div>
 """
         
         # Добавляем графики
         if self.plots_dir:
-            html += """
+            yield """
     <h2>📈 Визуализация</h2>
 """
             plots = [
@@ -384,31 +682,56 @@ class HTMLReporter:
             ]
             
             for plot_file, plot_title in plots:
-                plot_path = self.plots_dir / plot_file
-                if plot_path.exists():
-                    html += f"""
+                plot_src = self._plot_src(plot_file)
+                if plot_src is not None:
+                    yield f"""
     <div class="plot">
         <h3>{plot_title}</h3>
-        <img src="plots/{plot_file}" alt="{plot_title}">
+        <img src="{plot_src}" alt="{plot_title}">
     </div>
 """
         
         # Таблица метрик на тексте
-        html += """
-    <h2>📝 Метрики на тексте</h2>
-    <div class="metric-card">
-        <table>
-            <tr>
-                <th>Инструмент</th>
-                <th>Precision</th>
-                <th>Recall</th>
-                <th>F1-Score</th>
-                <th>FAR</th>
-            </tr>
-"""
+        yield """
+    <h2>📝 Метрики на тексте</h2>"""
+        yield _TABLE_HEADER
+        
+        yield from self._table_rows(self._text_by_tool)
+        
+        yield _TABLE_FOOTER
+        
+        # Таблица метрик на аудио
+        if self.audio_metrics:
+            yield """
+    <h2>🎤 Метрики на аудио</h2>"""
+            yield _TABLE_HEADER
+            
+            yield from self._table_rows(self._audio_by_tool)
+            
+            yield _TABLE_FOOTER
         
-        tools = {k: v for k, v in self.text_metrics.items() if k != 'overall'}
-        for tool, metrics in sorted(tools.items()):
+        yield _HTML_FOOTER
+    
+    def _plot_src(self, plot_file: str) -> Optional[str]:
+        """
+        Получить значение src для графика.
+        
+        Returns:
+            Относительный путь или data URI; None, если графика нет.
+        """
+        plot_path = self.plots_dir / plot_file
+        if not self.inline_images:
+            return f"plots/{plot_file}" if plot_path.exists() else None
+        
+        try:
+            data = plot_path.read_bytes()
+        except FileNotFoundError:
+            return None
+        return f"data:image/png;base64,{base64.b64encode(data).decode('ascii')}"
+    
+    def _table_rows(self, metrics_by_tool: Dict) -> Iterator[str]:
+        """Сгенерировать строки таблицы метрик по инструментам."""
+        for tool, metrics in metrics_by_tool.items():
             precision = metrics.get('precision', 0)
             recall = metrics.get('recall', 0)
             f1 = metrics.get('f1', 0)
@@ -419,49 +742,7 @@ class HTMLReporter:
             f1_class = self._get_metric_class(f1)
             far_class = self._get_metric_class(1 - far)  # Инвертируем для FAR
             
-            html += f"""
-            <tr>
-                <td>{tool}</td>
-                <td class="{precision_class}">{precision:.2%}</td>
-                <td class="{recall_class}">{recall:.2%}</td>
-                <td class="{f1_class}">{f1:.2%}</td>
-                <td class="{far_class}">{far:.2%}</td>
-            </tr>
-"""
-        
-        html += """
-        </table>
-    </div>
-"""
-        
-        # Таблица метрик на аудио
-        if self.audio_metrics:
-            html += """
-    <h2>🎤 Метрики на аудио</h2>
-    <div class="metric-card">
-        <table>
-            <tr>
-                <th>Инструмент</th>
-                <th>Precision</th>
-                <th>Recall</th>
-                <th>F1-Score</th>
-                <th>FAR</th>
-            </tr>
-"""
-            
-            tools = {k: v for k, v in self.audio_metrics.items() if k != 'overall'}
-            for tool, metrics in sorted(tools.items()):
-                precision = metrics.get('precision', 0)
-                recall = metrics.get('recall', 0)
-                f1 = metrics.get('f1', 0)
-                far = metrics.get('false_alarm_rate', 0)
-                
-                precision_class = self._get_metric_class(precision)
-                recall_class = self._get_metric_class(recall)
-                f1_class = self._get_metric_class(f1)
-                far_class = self._get_metric_class(1 - far)
-                
-                html += f"""
+            yield f"""
             <tr>
                 <td>{tool}</td>
                 <td class="{precision_class}">{precision:.2%}</td>
@@ -470,27 +751,10 @@ class HTMLReporter:
                 <td class="{far_class}">{far:.2%}</td>
             </tr>
 """
-            
-            html += """
-        </table>
-    </div>
-"""
-        
-        html += """
-</body>
-</html>
-"""
-        
-        return html
     
     def _get_metric_class(self, value: float) -> str:
         """Получить CSS класс для метрики."""
-        if value >= 0.9:
-            return "good"
-        elif value >= 0.7:
-            return "warning"
-        else:
-            return "bad"
+        return _METRIC_CLASSES[bisect.bisect_right(_METRIC_THRESHOLDS, value)]
 # END:html_reporter
 
 
@@ -522,6 +786,17 @@ def main():
         default="data/results",
         help="Директория для сохранения результатов"
     )
+    parser.add_argument(
+        "--dpi",
+        type=int,
+        default=PLOT_DPI,
+        help="Разрешение графиков"
+    )
+    parser.add_argument(
+        "--inline-images",
+        action="store_true",
+        help="Встроить графики в HTML отчет (автономный файл)"
+    )
     
     args = parser.parse_args()
     
@@ -533,31 +808,20 @@ def main():
         text_metrics_path=args.text_metrics,
         audio_metrics_path=args.audio_metrics,
         gap_metrics_path=args.gap_metrics,
-        output_dir=str(plots_dir)
+        output_dir=str(plots_dir),
+        dpi=args.dpi
     )
     
     # Генерируем графики
     visualizer.generate_all_plots()
     
-    # Генерируем HTML отчет
-    with open(args.text_metrics, 'r', encoding='utf-8') as f:
-        text_metrics = json.load(f)
-    
-    audio_metrics = None
-    if args.audio_metrics and Path(args.audio_metrics).exists():
-        with open(args.audio_metrics, 'r', encoding='utf-8') as f:
-            audio_metrics = json.load(f)
-    
-    gap_metrics = None
-    if args.gap_metrics and Path(args.gap_metrics).exists():
-        with open(args.gap_metrics, 'r', encoding='utf-8') as f:
-            gap_metrics = json.load(f)
-    
+    # Генерируем HTML отчет (метрики уже загружены визуализатором)
     reporter = HTMLReporter(
-        text_metrics=text_metrics,
-        audio_metrics=audio_metrics,
-        gap_metrics=gap_metrics,
-        plots_dir=plots_dir
+        text_metrics=visualizer.text_metrics,
+        audio_metrics=visualizer.audio_metrics,
+        gap_metrics=visualizer.gap_metrics,
+        plots_dir=plots_dir,
+        inline_images=args.inline_images
     )
     
     report_path = output_dir / "report.html"
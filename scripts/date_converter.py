@@ -2,46 +2,99 @@
 Конвертер дат в текстовое представление для TTS.
 """
 
+import functools
 import re
-from datetime import datetime
+from datetime import date, datetime
+from typing import List, Tuple
+
+
+# Шаблоны форматов дат (компилируются один раз при импорте)
+_ISO_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_DDMMYYYY_RE = re.compile(r'^\d{2}\.\d{2}\.\d{4}$')
+_DIGIT_RE = re.compile(r'\d')
+
+
+def _parse_iso(date_str: str) -> date:
+    """
+    Распарсить дату в формате YYYY-MM-DD.
+    
+    Строгий формат разбирается срезами без strptime, остальные
+    варианты (например, без ведущих нулей) - через strptime.
+    
+    Raises:
+        ValueError: Если строка не является корректной датой.
+    """
+    if _ISO_RE.match(date_str):
+        return date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
 
 
 # ANCHOR:date_to_text_converter
 class DateToTextConverter:
     """Конвертер дат в текстовое представление для корректного озвучивания."""
     
+    # Словари с последовательными числовыми ключами хранятся кортежами,
+    # индекс совпадает с числом (нулевой элемент не используется)
+    
     # Месяцы в родительном падеже
-    MONTHS_GENITIVE = {
-        1: "января", 2: "февраля", 3: "марта", 4: "апреля",
-        5: "мая", 6: "июня", 7: "июля", 8: "августа",
-        9: "сентября", 10: "октября", 11: "ноября", 12: "декабря"
-    }
+    MONTHS_GENITIVE = (
+        "",
+        "января", "февраля", "марта", "апреля",
+        "мая", "июня", "июля", "августа",
+        "сентября", "октября", "ноября", "декабря"
+    )
     
     # Дни месяца в именительном падеже (среднего рода)
-    DAYS = {
-        1: "первое", 2: "второе", 3: "третье", 4: "четвёртое",
-        5: "пятое", 6: "шестое", 7: "седьмое", 8: "восьмое",
-        9: "девятое", 10: "десятое", 11: "одиннадцатое",
-        12: "двенадцатое", 13: "тринадцатое", 14: "четырнадцатое",
-        15: "пятнадцатое", 16: "шестнадцатое", 17: "семнадцатое",
-        18: "восемнадцатое", 19: "девятнадцатое", 20: "двадцатое",
-        21: "двадцать первое", 22: "двадцать второе",
-        23: "двадцать третье", 24: "двадцать четвёртое",
-        25: "двадцать пятое", 26: "двадцать шестое",
-        27: "двадцать седьмое", 28: "двадцать восьмое",
-        29: "двадцать девятое", 30: "тридцатое",
-        31: "тридцать первое"
-    }
+    DAYS = (
+        "",
+        "первое", "второе", "третье", "четвёртое",
+        "пятое", "шестое", "седьмое", "восьмое",
+        "девятое", "десятое", "одиннадцатое",
+        "двенадцатое", "тринадцатое", "четырнадцатое",
+        "пятнадцатое", "шестнадцатое", "семнадцатое",
+        "восемнадцатое", "девятнадцатое", "двадцатое",
+        "двадцать первое", "двадцать второе",
+        "двадцать третье", "двадцать четвёртое",
+        "двадцать пятое", "двадцать шестое",
+        "двадцать седьмое", "двадцать восьмое",
+        "двадцать девятое", "тридцатое",
+        "тридцать первое"
+    )
     
-    # Числа для конвертации в текст
-    NUMBERS = {
-        "1": "один", "2": "два", "3": "три", "4": "четыре",
-        "5": "пять", "6": "шесть", "7": "семь", "8": "восемь",
-        "9": "девять", "10": "десять", "11": "одиннадцать",
-        "12": "двенадцать", "13": "тринадцать", "14": "четырнадцать",
-        "15": "пятнадцать", "16": "шестнадцать", "17": "семнадцать",
-        "18": "восемнадцать", "19": "девятнадцать", "20": "двадцать"
-    }
+    # Порядковые числительные в родительном падеже (1-30)
+    ORDINALS_GENITIVE = (
+        "",
+        "первого", "второго", "третьего", "четвёртого",
+        "пятого", "шестого", "седьмого", "восьмого",
+        "девятого", "десятого", "одиннадцатого",
+        "двенадцатого", "тринадцатого", "четырнадцатого",
+        "пятнадцатого", "шестнадцатого", "семнадцатого",
+        "восемнадцатого", "девятнадцатого", "двадцатого",
+        "двадцать первого", "двадцать второго",
+        "двадцать третьего", "двадцать четвёртого",
+        "двадцать пятого", "двадцать шестого",
+        "двадцать седьмого", "двадцать восьмого",
+        "двадцать девятого", "тридцатого"
+    )
+    
+    # Десятки (2-9)
+    TENS = (
+        "", "",
+        "двадцать", "тридцать", "сорок",
+        "пятьдесят", "шестьдесят", "семьдесят",
+        "восемьдесят", "девяносто"
+    )
+    
+    # Числа для конвертации в текст (1-20)
+    NUMBERS = (
+        "",
+        "один", "два", "три", "четыре",
+        "пять", "шесть", "семь", "восемь",
+        "девять", "десять", "одиннадцать",
+        "двенадцать", "тринадцать", "четырнадцать",
+        "пятнадцать", "шестнадцать", "семнадцать",
+        "восемнадцать", "девятнадцать", "двадцать"
+    )
     
     # Годы (для частых случаев)
     YEARS = {
@@ -52,6 +105,27 @@ class DateToTextConverter:
         2030: "две тысячи тридцатого года"
     }
     
+    # Числа в относительных датах: "через 3" или "3 дня/дней/недели/месяца".
+    # Одна альтернатива вместо отдельного шаблона на каждую пару число/форма,
+    # строка просматривается за один проход.
+    _NUMBERS_ALT = '|'.join(str(num) for num in range(len(NUMBERS) - 1, 0, -1))
+    _RELATIVE_NUMBER_RE = re.compile(
+        rf'\b(?:(через )({_NUMBERS_ALT})\b'
+        rf'|({_NUMBERS_ALT})(?= (?:день|дня|дней|недел|месяц)))'
+    )
+    
+    # Ключевые слова относительных дат
+    RELATIVE_KEYWORDS = [
+        "завтра", "послезавтра", "вчера", "сегодня",
+        "через", "назад",
+        "понедельник", "вторник", "среду", "четверг",
+        "пятницу", "субботу", "воскресенье",
+        "следующ", "прошл", "этот", "эт"
+    ]
+    _RELATIVE_RE = re.compile(
+        '|'.join(map(re.escape, RELATIVE_KEYWORDS)), re.IGNORECASE
+    )
+    
     def convert_date(
         self,
         date_str: str,
@@ -69,15 +143,21 @@ class DateToTextConverter:
         Returns:
             Дата текстом.
         """
+        return self._convert_date(date_str, include_year)
+    
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _convert_date(cls, date_str: str, include_year: bool) -> str:
+        """Конвертировать дату в текст (с кэшированием повторяющихся дат)."""
         try:
             # Парсим дату
-            date = datetime.strptime(date_str, "%Y-%m-%d")
+            parsed = _parse_iso(date_str)
             
-            day = self.DAYS.get(date.day, str(date.day))
-            month = self.MONTHS_GENITIVE.get(date.month, "")
+            day = cls.DAYS[parsed.day]
+            month = cls.MONTHS_GENITIVE[parsed.month]
             
             if include_year:
-                year = self._year_to_text(date.year)
+                year = cls._year_to_text(parsed.year)
                 return f"{day} {month} {year}"
             else:
                 return f"{day} {month}"
@@ -85,10 +165,14 @@ class DateToTextConverter:
             # Fallback: возвращаем исходную строку
             return date_str
     
-    def _year_to_text(self, year: int) -> str:
+    @classmethod
+    @functools.lru_cache(maxsize=128)
+    def _year_to_text(cls, year: int) -> str:
         """
         Конвертировать год в текст.
         
+        Результат зависит только от года, поэтому кэшируется.
+        
         Args:
             year: Год (например, 2026).
             
@@ -96,8 +180,8 @@ class DateToTextConverter:
             Год текстом в родительном падеже.
         """
         # Используем предопределённые значения
-        if year in self.YEARS:
-            return self.YEARS[year]
+        if year in cls.YEARS:
+            return cls.YEARS[year]
         
         # Для других годов - упрощённая логика
         if 2020 <= year <= 2099:
@@ -107,30 +191,25 @@ class DateToTextConverter:
             if remainder == 0:
                 return f"{thousands} года"
             elif remainder < 20:
-                tens_text = self._number_to_ordinal(remainder)
+                tens_text = cls._number_to_ordinal(remainder)
                 return f"{thousands} {tens_text} года"
             else:
                 tens = remainder // 10
                 ones = remainder % 10
                 
-                tens_map = {
-                    2: "двадцать", 3: "тридцать", 4: "сорок",
-                    5: "пятьдесят", 6: "шестьдесят", 7: "семьдесят",
-                    8: "восемьдесят", 9: "девяносто"
-                }
-                
-                tens_text = tens_map.get(tens, "")
+                tens_text = cls.TENS[tens]
                 
                 if ones == 0:
                     return f"{thousands} {tens_text} года"
                 else:
-                    ones_text = self._number_to_ordinal(ones)
+                    ones_text = cls._number_to_ordinal(ones)
                     return f"{thousands} {tens_text} {ones_text} года"
         
         # Fallback
         return f"{year} года"
     
-    def _number_to_ordinal(self, num: int) -> str:
+    @classmethod
+    def _number_to_ordinal(cls, num: int) -> str:
         """
         Конвертировать число в порядковое числительное (родительный падеж).
         
@@ -140,21 +219,9 @@ class DateToTextConverter:
         Returns:
             Порядковое числительное.
         """
-        ordinals = {
-            1: "первого", 2: "второго", 3: "третьего", 4: "четвёртого",
-            5: "пятого", 6: "шестого", 7: "седьмого", 8: "восьмого",
-            9: "девятого", 10: "десятого", 11: "одиннадцатого",
-            12: "двенадцатого", 13: "тринадцатого", 14: "четырнадцатого",
-            15: "пятнадцатого", 16: "шестнадцатого", 17: "семнадцатого",
-            18: "восемнадцатого", 19: "девятнадцатого", 20: "двадцатого",
-            21: "двадцать первого", 22: "двадцать второго",
-            23: "двадцать третьего", 24: "двадцать четвёртого",
-            25: "двадцать пятого", 26: "двадцать шестого",
-            27: "двадцать седьмого", 28: "двадцать восьмого",
-            29: "двадцать девятого", 30: "тридцатого"
-        }
-        
-        return ordinals.get(num, str(num))
+        if 1 <= num < len(cls.ORDINALS_GENITIVE):
+            return cls.ORDINALS_GENITIVE[num]
+        return str(num)
     
     def convert_relative_date(self, date_desc: str) -> str:
         """
@@ -166,19 +233,18 @@ class DateToTextConverter:
         Returns:
             Дата с числами прописью.
         """
-        result = date_desc
+        # Без цифр заменять нечего ("завтра", "в среду")
+        if not _DIGIT_RE.search(date_desc):
+            return date_desc
         
-        # Заменяем числа на слова
-        for num, word in self.NUMBERS.items():
-            # "через 3 дня" -> "через три дня"
-            result = re.sub(rf'\bчерез {num}\b', f'через {word}', result)
-            result = re.sub(rf'\b{num} день', f'{word} день', result)
-            result = re.sub(rf'\b{num} дня', f'{word} дня', result)
-            result = re.sub(rf'\b{num} дней', f'{word} дней', result)
-            result = re.sub(rf'\b{num} недел', f'{word} недел', result)
-            result = re.sub(rf'\b{num} месяц', f'{word} месяц', result)
-        
-        return result
+        # Заменяем числа на слова: "через 3 дня" -> "через три дня"
+        return self._RELATIVE_NUMBER_RE.sub(self._replace_relative_number, date_desc)
+    
+    def _replace_relative_number(self, match: re.Match) -> str:
+        """Заменить найденное в относительной дате число словом."""
+        prefix = match.group(1) or ""
+        num = match.group(2) or match.group(3)
+        return f"{prefix}{self.NUMBERS[int(num)]}"
     
     def is_relative_date(self, date_desc: str) -> bool:
         """
@@ -190,16 +256,7 @@ class DateToTextConverter:
         Returns:
             True если относительная дата.
         """
-        relative_keywords = [
-            "завтра", "послезавтра", "вчера", "сегодня",
-            "через", "назад",
-            "понедельник", "вторник", "среду", "четверг",
-            "пятницу", "субботу", "воскресенье",
-            "следующ", "прошл", "этот", "эт"
-        ]
-        
-        date_lower = date_desc.lower()
-        return any(keyword in date_lower for keyword in relative_keywords)
+        return self._RELATIVE_RE.search(date_desc) is not None
     
     def is_iso_date(self, date_desc: str) -> bool:
         """
@@ -211,7 +268,7 @@ class DateToTextConverter:
         Returns:
             True если ISO формат.
         """
-        return bool(re.match(r'^\d{4}-\d{2}-\d{2}$', date_desc))
+        return bool(_ISO_RE.match(date_desc))
     
     def is_ddmmyyyy_date(self, date_desc: str) -> bool:
         """
@@ -223,7 +280,7 @@ class DateToTextConverter:
         Returns:
             True если DD.MM.YYYY формат.
         """
-        return bool(re.match(r'^\d{2}\.\d{2}\.\d{4}$', date_desc))
+        return bool(_DDMMYYYY_RE.match(date_desc))
     
     def convert_text_for_tts(
         self,
@@ -242,6 +299,40 @@ class DateToTextConverter:
         Returns:
             Текст для TTS с датами прописью.
         """
+        return self._convert_text_for_tts(
+            text, date_iso, date_desc, date.today().toordinal()
+        )
+    
+    def convert_text_for_tts_batch(
+        self,
+        items: List[Tuple[str, str, str]]
+    ) -> List[str]:
+        """
+        Конвертировать набор текстов для TTS.
+        
+        Текущая дата определяется один раз на весь набор.
+        
+        Args:
+            items: Кортежи (text, date_iso, date_desc), как в convert_text_for_tts.
+            
+        Returns:
+            Тексты для TTS в исходном порядке.
+        """
+        today = date.today().toordinal()
+        convert = self._convert_text_for_tts
+        return [
+            convert(text, date_iso, date_desc, today)
+            for text, date_iso, date_desc in items
+        ]
+    
+    def _convert_text_for_tts(
+        self,
+        text: str,
+        date_iso: str,
+        date_desc: str,
+        today: int
+    ) -> str:
+        """Конвертировать текст для TTS относительно дня с порядковым номером today."""
         # Если дата относительная - оставляем как есть
         if self.is_relative_date(date_desc):
             # Но заменяем числа на слова
@@ -251,12 +342,12 @@ class DateToTextConverter:
         if self.is_iso_date(date_desc) or self.is_ddmmyyyy_date(date_desc):
             # Определяем нужен ли год (если дата далеко в будущем)
             try:
-                date = datetime.strptime(date_iso, "%Y-%m-%d")
-                today = datetime.now()
-                days_diff = (date - today).days
+                days_diff = _parse_iso(date_iso).toordinal() - today
                 
-                # Если дата больше чем через месяц - включаем год
-                include_year = days_diff > 30
+                # Если дата больше чем через месяц - включаем год.
+                # Порог 31 календарный день: прежде разница считалась от текущего
+                # момента и округлялась вниз, то есть была на день меньше
+                include_year = days_diff > 31
             except:
                 include_year = True
             
@@ -313,8 +404,8 @@ def main():
         ("Найди рейсы через 3 дня", "2026-02-05", "через 3 дня"),
     ]
     
-    for text, date_iso, date_desc in test_cases:
-        result = converter.convert_text_for_tts(text, date_iso, date_desc)
+    results = converter.convert_text_for_tts_batch(test_cases)
+    for (text, _, _), result in zip(test_cases, results):
         print(f"  Исходный: {text}")
         print(f"  Для TTS:  {result}")
         print()
@@ -5,46 +5,252 @@
 """
 from dotenv import load_dotenv
 
-import json
 import argparse
 import asyncio
+import hashlib
+import os
+import sys
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+from collections import Counter
 
-from src.agent import create_agent
-from src.core.logger import get_module_logger
+import httpx
+import numpy as np
+import orjson
+from tqdm import tqdm
 
-# Загружаем переменные окружения
-load_dotenv()
+from src.agent import create_agent, get_system_prompt
+from src.core.config import get_config
+from src.core.logger import get_module_logger
 
 logger = get_module_logger(__name__)
 
 
+def _load_json(path: Path) -> Any:
+    """Загрузить JSON файл."""
+    return orjson.loads(path.read_bytes())
+
+
+# Метрики инструмента, по которым считается разрыв модальностей
+_GAP_FIELDS = ("precision", "recall", "f1", "false_alarm_rate")
+_gap_row = itemgetter(*_GAP_FIELDS)
+# Нули для инструмента, встретившегося только в одной модальности
+_EMPTY_TOOL_METRICS = dict.fromkeys(_GAP_FIELDS, 0.0)
+
+
+def _dump_json(path: Path, data: Any, indent: bool = True) -> None:
+    """
+    Записать JSON файл одним вызовом.
+    
+    Args:
+        path: Путь к файлу.
+        data: Сериализуемые данные.
+        indent: Форматировать с отступом в 2 пробела.
+    """
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0))
+
+
+def _intern_tool(tool: Optional[str]) -> Optional[str]:
+    """
+    Интернировать имя инструмента.
+    
+    Имен инструментов немного, а сравниваются они для каждой пары результатов;
+    у интернированных строк == сводится к сравнению указателей.
+    """
+    return sys.intern(tool) if isinstance(tool, str) else tool
+
+
+def _read_file(path: str) -> Optional[bytes]:
+    """Прочитать файл целиком; None, если файла нет."""
+    try:
+        return Path(path).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Поэлементное деление, дающее 0.0 там, где знаменатель не положителен."""
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(len(numerator), dtype=np.float64),
+        where=denominator > 0
+    )
+
+
 # ANCHOR:metrics_calculator
 class MetricsCalculator:
     """Калькулятор метрик для оценки качества."""
     
-    def __init__(self, dataset_path: str):
+    def __init__(
+        self,
+        dataset_path: str,
+        concurrency: int = 8,
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache_file: Optional[str] = None,
+        use_cache: bool = True
+    ):
         """
         Инициализация калькулятора.
         
         Args:
             dataset_path: Путь к датасету.
+            concurrency: Максимальное число одновременно обрабатываемых примеров.
+            http_client: Общий HTTP клиент агента на весь прогон оценки.
+            cache_file: Путь к файлу кэша результатов по примерам.
+            use_cache: Использовать ли кэш.
         """
         self.dataset_path = Path(dataset_path)
+        self.concurrency = max(1, concurrency)
+        self.http_client = http_client
+        self.use_cache = use_cache
+        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.cache_file = Path(cache_file) if cache_file and use_cache else None
+        self.agent_version = self._agent_version() if use_cache else None
         
-        with open(self.dataset_path, 'r', encoding='utf-8') as f:
-            self.dataset: List[Dict] = json.load(f)
+        if self.cache_file:
+            self._load_cache()
+        
+        self.dataset: List[Dict] = _load_json(self.dataset_path)
         
         self.text_results: List[Dict] = []
         self.audio_results: List[Dict] = []
+        # Пары (каталог, имя) существующих аудиофайлов; None - не проверять заранее
+        self._audio_files: Optional[Set[Tuple[str, str]]] = None
         self.agent = None
     
     def _init_agent(self):
-        """Инициализировать агента."""
+        """
+        Инициализировать агента при первом обращении.
+        
+        Агент создается один раз на калькулятор и живет столько же, сколько
+        калькулятор и его HTTP клиент: оценка текста и аудио идет через него.
+        """
         if self.agent is None:
-            self.agent = create_agent()
+            self.agent = create_agent(http_client=self.http_client)
+    
+    @staticmethod
+    def _agent_version() -> str:
+        """
+        Отпечаток конфигурации агента.
+        
+        Returns:
+            Короткий хеш модели, режима и системного промпта.
+        """
+        llm = get_config().llm
+        fingerprint = "|".join([
+            llm.provider,
+            llm.model,
+            str(llm.router_mode),
+            str(llm.max_steps),
+            get_system_prompt()
+        ])
+        return hashlib.blake2b(fingerprint.encode('utf-8'), digest_size=8).hexdigest()
+    
+    def _cache_key(self, modality: str, sample_id: str, payload: bytes) -> str:
+        """
+        Построить ключ кэша для примера.
+        
+        Args:
+            modality: Модальность ("text" или "audio").
+            sample_id: Идентификатор примера.
+            payload: Текст запроса или содержимое аудиофайла.
+            
+        Returns:
+            Ключ кэша.
+        """
+        digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+        return f"{modality}:{sample_id}:{digest}:{self.agent_version}"
+    
+    def _load_cache(self):
+        """Загрузить кэш из файла, отбросив записи других версий агента."""
+        if self.cache_file and self.cache_file.exists():
+            try:
+                cache = _load_json(self.cache_file)
+                suffix = f":{self.agent_version}"
+                self.cache = {k: v for k, v in cache.items() if k.endswith(suffix)}
+                for output in self.cache.values():
+                    output['predicted_tool'] = _intern_tool(output['predicted_tool'])
+                print(f"✓ Загружен кэш: {len(self.cache)} записей")
+            except Exception as e:
+                print(f"⚠️  Ошибка загрузки кэша: {e}")
+                self.cache = {}
+    
+    def _save_cache(self):
+        """Сохранить кэш в файл."""
+        if self.cache_file:
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                _dump_json(self.cache_file, self.cache, indent=False)
+            except Exception as e:
+                print(f"⚠️  Ошибка сохранения кэша: {e}")
+    
+    async def _run_agent(
+        self,
+        modality: str,
+        sample_id: str,
+        payload: bytes,
+        request: Union[str, bytes]
+    ) -> Dict[str, Any]:
+        """
+        Получить ответ агента на запрос (из кэша, если он есть).
+        
+        В кэше хранится только вывод модели: ожидаемый инструмент и
+        правильность ответа вычисляются по текущей разметке примера.
+        
+        Args:
+            modality: Модальность ("text" или "audio").
+            sample_id: Идентификатор примера.
+            payload: Байты запроса для ключа кэша.
+            request: Запрос, передаваемый агенту.
+            
+        Returns:
+            Словарь с predicted_tool, parsable, success и steps.
+        """
+        cache_key = None
+        if self.use_cache:
+            cache_key = self._cache_key(modality, sample_id, payload)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        self._init_agent()
+        
+        # Обрабатываем запрос
+        result = await self.agent.process_request(request)
+        
+        # Извлекаем вызванный инструмент
+        predicted_tool = None
+        parsable = False
+        
+        if result.get('steps'):
+            # Берем первый шаг (основной вызов инструмента)
+            first_step = result['steps'][0]
+            predicted_tool = _intern_tool(first_step.get('tool'))
+
+            parsable = True if predicted_tool is not None else False
+            # Проверяем, можно ли распарсить вызов
+            # try:
+            #    if first_step.get('params') is not None:
+            #        parsable = True
+            #except:
+            #    parsable = False
+        
+        output = {
+            "predicted_tool": predicted_tool,
+            "parsable": parsable,
+            "success": result.get('success', False),
+            "steps": len(result.get('steps', []))
+        }
+        
+        # Ошибки не кэшируем: агент перехватывает сбои LLM и сети и
+        # возвращает их в 'error', а временный сбой не должен повторяться
+        # при следующих прогонах
+        if self.use_cache and 'error' not in result:
+            self.cache[cache_key] = output
+        
+        return output
     
     async def evaluate_sample_text(self, sample: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -61,40 +267,19 @@ class MetricsCalculator:
         expected_params = sample.get('params', {})
         
         try:
-            self._init_agent()
-            
-            # Обрабатываем запрос
-            result = await self.agent.process_request(text)
-            
-            # Извлекаем вызванный инструмент
-            predicted_tool = None
-            parsable = False
-            
-            if result.get('steps'):
-                # Берем первый шаг (основной вызов инструмента)
-                first_step = result['steps'][0]
-                predicted_tool = first_step.get('tool')
-
-                parsable = True if predicted_tool is not None else False
-                # Проверяем, можно ли распарсить вызов
-                # try:
-                #    if first_step.get('params') is not None:
-                #        parsable = True
-                #except:
-                #    parsable = False
-            
-            # Сравниваем с ожидаемым
-            correct_tool = (predicted_tool == expected_tool)
+            output = await self._run_agent("text", sample['id'], text.encode('utf-8'), text)
+            predicted_tool = output['predicted_tool']
             
             return {
                 "id": sample['id'],
                 "text": text,
                 "expected_tool": expected_tool,
                 "predicted_tool": predicted_tool,
-                "correct_tool": correct_tool,
-                "parsable": parsable,
-                "success": result.get('success', False),
-                "steps": len(result.get('steps', []))
+                # Сравниваем с ожидаемым
+                "correct_tool": predicted_tool == expected_tool,
+                "parsable": output['parsable'],
+                "success": output['success'],
+                "steps": output['steps']
             }
             
         except Exception as e:
@@ -122,54 +307,42 @@ class MetricsCalculator:
         """
         audio_path = sample.get('audio_path')
         expected_tool = sample['tool']
+        not_found = {
+            "id": sample['id'],
+            "expected_tool": expected_tool,
+            "predicted_tool": None,
+            "correct_tool": False,
+            "parsable": False,
+            "success": False,
+            "error": "Audio file not found"
+        }
         
-        if not audio_path or not Path(audio_path).exists():
-            return {
-                "id": sample['id'],
-                "expected_tool": expected_tool,
-                "predicted_tool": None,
-                "correct_tool": False,
-                "parsable": False,
-                "success": False,
-                "error": "Audio file not found"
-            }
+        if not audio_path:
+            return not_found
+        if self._audio_files is not None and os.path.split(audio_path) not in self._audio_files:
+            return not_found
         
         try:
-            self._init_agent()
-            
-            # Загружаем аудио
-            with open(audio_path, 'rb') as f:
-                audio_bytes = f.read()
+            # Загружаем аудио в потоке, чтобы чтение диска не блокировало цикл событий
+            # и шло параллельно с запросами к агенту по другим примерам
+            audio_bytes = await asyncio.to_thread(_read_file, audio_path)
             
-            # Обрабатываем аудио запрос
-            result = await self.agent.process_request(audio_bytes)
+            # Файл мог исчезнуть после сканирования каталога
+            if audio_bytes is None:
+                return not_found
             
-            # Извлекаем вызванный инструмент
-            predicted_tool = None
-            parsable = False
-            
-            if result.get('steps'):
-                first_step = result['steps'][0]
-                predicted_tool = first_step.get('tool')
-
-                parsable = True if predicted_tool is not None else False
-                # try:
-                #    if first_step.get('params') is not None:
-                #        parsable = True
-                # except:
-                #     parsable = False
-            
-            correct_tool = (predicted_tool == expected_tool)
+            output = await self._run_agent("audio", sample['id'], audio_bytes, audio_bytes)
+            predicted_tool = output['predicted_tool']
             
             return {
                 "id": sample['id'],
                 "audio_path": audio_path,
                 "expected_tool": expected_tool,
                 "predicted_tool": predicted_tool,
-                "correct_tool": correct_tool,
-                "parsable": parsable,
-                "success": result.get('success', False),
-                "steps": len(result.get('steps', []))
+                "correct_tool": predicted_tool == expected_tool,
+                "parsable": output['parsable'],
+                "success": output['success'],
+                "steps": output['steps']
             }
             
         except Exception as e:
@@ -185,16 +358,74 @@ class MetricsCalculator:
                 "error": str(e)
             }
     
+    async def _evaluate_concurrently(
+        self,
+        samples: List[Dict[str, Any]],
+        evaluate: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Оценить примеры параллельно с ограничением числа одновременных запросов.
+        
+        Args:
+            samples: Примеры из датасета.
+            evaluate: Корутина оценки одного примера.
+            
+        Returns:
+            Результаты оценки в порядке примеров.
+        """
+        # Агент создается до запуска задач, чтобы не инициализировать его в каждой
+        self._init_agent()
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # tqdm перерисовывает строку не чаще mininterval, а не на каждый пример
+        progress = tqdm(total=len(samples), desc="Обработано")
+        
+        async def run(sample: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                result = await evaluate(sample)
+            progress.update()
+            return result
+        
+        with progress:
+            return list(await asyncio.gather(*(run(sample) for sample in samples)))
+    
+    @staticmethod
+    def _scan_audio_files(samples: List[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+        """
+        Просканировать каталоги с аудио одним проходом os.scandir.
+        
+        Заменяет проверку существования файла (stat) для каждого примера
+        проверкой вхождения в множество.
+        
+        Args:
+            samples: Примеры с аудио.
+            
+        Returns:
+            Множество пар (каталог, имя файла) в формате os.path.split.
+        """
+        directories = {os.path.dirname(s['audio_path']) for s in samples if s.get('audio_path')}
+        files: Set[Tuple[str, str]] = set()
+        
+        for directory in directories:
+            try:
+                with os.scandir(directory or '.') as entries:
+                    files.update((directory, entry.name) for entry in entries)
+            except OSError:
+                # Каталога нет - все его файлы будут считаться отсутствующими
+                continue
+        
+        return files
+    
     async def evaluate_text_modality(self) -> None:
         """Оценить все примеры на тексте."""
         print(f"Оценка на тексте: {len(self.dataset)} примеров...")
         
-        for i, sample in enumerate(self.dataset, 1):
-            print(f"\rОбработано: {i}/{len(self.dataset)}\n", end="")
-            result = await self.evaluate_sample_text(sample)
-            self.text_results.append(result)
+        self.text_results.extend(
+            await self._evaluate_concurrently(self.dataset, self.evaluate_sample_text)
+        )
+        self._save_cache()
         
-        print("\n✓ Оценка на тексте завершена")
+        print("✓ Оценка на тексте завершена")
     
     async def evaluate_audio_modality(self) -> None:
         """Оценить все примеры на аудио."""
@@ -203,12 +434,12 @@ class MetricsCalculator:
         
         print(f"Оценка на аудио: {len(audio_samples)} примеров...")
         
-        for i, sample in enumerate(audio_samples, 1):
-            print(f"\rОбработано: {i}/{len(audio_samples)}\n", end="")
-            result = await self.evaluate_sample_audio(sample)
-            self.audio_results.append(result)
+        self._audio_files = self._scan_audio_files(audio_samples)
+        results = await self._evaluate_concurrently(audio_samples, self.evaluate_sample_audio)
+        self.audio_results.extend(results)
+        self._save_cache()
         
-        print("\n✓ Оценка на аудио завершена")
+        print("✓ Оценка на аудио завершена")
     
     def calculate_metrics(self, results: List[Dict]) -> Dict[str, Any]:
         """
@@ -220,54 +451,61 @@ class MetricsCalculator:
         Returns:
             Словарь с метриками.
         """
-        # Подсчет для каждого инструмента
-        tool_metrics = defaultdict(lambda: {"tp": 0, "fp": 0, "fn": 0, "tn": 0})
-        
-        # Все уникальные инструменты
-        all_tools = set()
-        for result in results:
-            all_tools.add(result['expected_tool'])
-            if result['predicted_tool']:
-                all_tools.add(result['predicted_tool'])
+        # Один проход: пары (ожидаемый, предсказанный) и частоты каждого из них.
+        # TP/FP/FN/TN для любого инструмента выводятся из этих счетчиков.
+        confusion = Counter()
+        expected_counts = Counter()
+        predicted_counts = Counter()
         
         for result in results:
             expected = result['expected_tool']
             predicted = result['predicted_tool']
-            
-            for tool in all_tools:
-                if expected == tool and predicted == tool:
-                    tool_metrics[tool]["tp"] += 1
-                elif expected != tool and predicted == tool:
-                    tool_metrics[tool]["fp"] += 1
-                elif expected == tool and predicted != tool:
-                    tool_metrics[tool]["fn"] += 1
-                elif expected != tool and predicted != tool:
-                    tool_metrics[tool]["tn"] += 1
-        
-        # Вычисляем метрики
-        metrics = {}
-        
-        for tool, counts in tool_metrics.items():
-            tp = counts["tp"]
-            fp = counts["fp"]
-            fn = counts["fn"]
-            tn = counts["tn"]
-            
-            precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-            recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-            f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0.0
-            far = fp / (fp + tn) if (fp + tn) > 0 else 0.0
-            
-            metrics[tool] = {
-                "precision": precision,
-                "recall": recall,
-                "f1": f1,
-                "false_alarm_rate": far,
-                "tp": tp,
-                "fp": fp,
-                "fn": fn,
-                "tn": tn
+            confusion[(expected, predicted)] += 1
+            expected_counts[expected] += 1
+            predicted_counts[predicted] += 1
+        
+        # Все уникальные инструменты
+        all_tools = set(expected_counts)
+        all_tools.update(tool for tool in predicted_counts if tool)
+        
+        # Вычисляем метрики сразу для всех инструментов
+        tools = sorted(all_tools)
+        count = len(tools)
+        
+        tp = np.fromiter((confusion[(tool, tool)] for tool in tools), dtype=np.int64, count=count)
+        fp = np.fromiter((predicted_counts[tool] for tool in tools), dtype=np.int64, count=count) - tp
+        fn = np.fromiter((expected_counts[tool] for tool in tools), dtype=np.int64, count=count) - tp
+        tn = len(results) - tp - fp - fn
+        
+        precision = _safe_divide(tp, tp + fp)
+        recall = _safe_divide(tp, tp + fn)
+        f1 = _safe_divide(2 * (precision * recall), precision + recall)
+        far = _safe_divide(fp, fp + tn)
+        
+        # tolist() возвращает встроенные float/int, которые сериализуются в JSON
+        metrics = {
+            tool: {
+                "precision": p,
+                "recall": r,
+                "f1": f,
+                "false_alarm_rate": a,
+                "tp": tp_,
+                "fp": fp_,
+                "fn": fn_,
+                "tn": tn_
             }
+            for tool, p, r, f, a, tp_, fp_, fn_, tn_ in zip(
+                tools,
+                precision.tolist(),
+                recall.tolist(),
+                f1.tolist(),
+                far.tolist(),
+                tp.tolist(),
+                fp.tolist(),
+                fn.tolist(),
+                tn.tolist()
+            )
+        }
         
         # Общая точность
         correct = sum(1 for r in results if r['correct_tool'])
@@ -325,39 +563,34 @@ class MetricsCalculator:
             )
         }
         
-        # Метрики по инструментам
-        all_tools = set(text_metrics.keys()) | set(audio_metrics.keys())
-        all_tools.discard("overall")
-        
-        for tool in all_tools:
-            text_tool = text_metrics.get(tool, {})
-            audio_tool = audio_metrics.get(tool, {})
-            
+        # Метрики по инструментам: матрицы (инструмент x метрика) для обеих модальностей
+        tools = sorted((text_metrics.keys() | audio_metrics.keys()) - {"overall"})
+        
+        text_values = np.array(
+            [_gap_row(text_metrics.get(tool, _EMPTY_TOOL_METRICS)) for tool in tools],
+            dtype=np.float64
+        ).reshape(len(tools), len(_GAP_FIELDS))
+        audio_values = np.array(
+            [_gap_row(audio_metrics.get(tool, _EMPTY_TOOL_METRICS)) for tool in tools],
+            dtype=np.float64
+        ).reshape(len(tools), len(_GAP_FIELDS))
+        
+        diff = text_values - audio_values
+        abs_gap = np.abs(diff).tolist()
+        # Относительный разрыв в процентах, 0 при нулевом значении на тексте
+        rel_gap = (
+            np.divide(diff, text_values, out=np.zeros_like(diff), where=text_values != 0) * 100.0
+        ).tolist()
+        
+        for tool, (p_abs, r_abs, f_abs, far_abs), (p_rel, r_rel, f_rel, _) in zip(tools, abs_gap, rel_gap):
             gap_metrics[tool] = {
-                "precision_gap_abs": abs(
-                    text_tool.get("precision", 0) - audio_tool.get("precision", 0)
-                ),
-                "precision_gap_rel": self._relative_gap(
-                    text_tool.get("precision", 0),
-                    audio_tool.get("precision", 0)
-                ),
-                "recall_gap_abs": abs(
-                    text_tool.get("recall", 0) - audio_tool.get("recall", 0)
-                ),
-                "recall_gap_rel": self._relative_gap(
-                    text_tool.get("recall", 0),
-                    audio_tool.get("recall", 0)
-                ),
-                "f1_gap_abs": abs(
-                    text_tool.get("f1", 0) - audio_tool.get("f1", 0)
-                ),
-                "f1_gap_rel": self._relative_gap(
-                    text_tool.get("f1", 0),
-                    audio_tool.get("f1", 0)
-                ),
-                "far_gap_abs": abs(
-                    text_tool.get("false_alarm_rate", 0) - audio_tool.get("false_alarm_rate", 0)
-                )
+                "precision_gap_abs": p_abs,
+                "precision_gap_rel": p_rel,
+                "recall_gap_abs": r_abs,
+                "recall_gap_rel": r_rel,
+                "f1_gap_abs": f_abs,
+                "f1_gap_rel": f_rel,
+                "far_gap_abs": far_abs
             }
         
         # Tool Agreement Rate
@@ -365,11 +598,12 @@ class MetricsCalculator:
             agreement_count = 0
             degradation_count = 0
             
-            # Создаем словарь для быстрого поиска
-            audio_dict = {r['id']: r for r in self.audio_results}
+            # Индекс строится по текущим результатам: audio_results
+            # могут быть загружены или дополнены в обход оценки
+            audio_by_id = {r['id']: r for r in self.audio_results}
             
             for text_result in self.text_results:
-                audio_result = audio_dict.get(text_result['id'])
+                audio_result = audio_by_id.get(text_result['id'])
                 if audio_result:
                     if text_result['predicted_tool'] == audio_result['predicted_tool']:
                         agreement_count += 1
@@ -455,44 +689,29 @@ class MetricsCalculator:
         
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Сохраняем результаты на тексте
-        if self.text_results:
-            text_results_path = output_dir / "text_results.json"
-            with open(text_results_path, 'w', encoding='utf-8') as f:
-                json.dump(self.text_results, f, ensure_ascii=False, indent=2)
-            print(f"✓ Результаты на тексте: {text_results_path}")
-        
-        # Сохраняем результаты на аудио
-        if self.audio_results:
-            audio_results_path = output_dir / "audio_results.json"
-            with open(audio_results_path, 'w', encoding='utf-8') as f:
-                json.dump(self.audio_results, f, ensure_ascii=False, indent=2)
-            print(f"✓ Результаты на аудио:  {audio_results_path}")
-        
-        # Сохраняем метрики
-        if text_metrics:
-            text_metrics_path = output_dir / "text_metrics.json"
-            with open(text_metrics_path, 'w', encoding='utf-8') as f:
-                json.dump(text_metrics, f, ensure_ascii=False, indent=2)
-            print(f"✓ Метрики на тексте:    {text_metrics_path}")
-        
-        if audio_metrics:
-            audio_metrics_path = output_dir / "audio_metrics.json"
-            with open(audio_metrics_path, 'w', encoding='utf-8') as f:
-                json.dump(audio_metrics, f, ensure_ascii=False, indent=2)
-            print(f"✓ Метрики на аудио:     {audio_metrics_path}")
-        
-        if gap_metrics:
-            gap_metrics_path = output_dir / "modality_gap.json"
-            with open(gap_metrics_path, 'w', encoding='utf-8') as f:
-                json.dump(gap_metrics, f, ensure_ascii=False, indent=2)
-            print(f"✓ Разрыв модальностей:  {gap_metrics_path}")
+        # Результаты по примерам, затем метрики; пустые разделы пропускаются
+        outputs = [
+            (self.text_results, "text_results.json", "Результаты на тексте: "),
+            (self.audio_results, "audio_results.json", "Результаты на аудио:  "),
+            (text_metrics, "text_metrics.json", "Метрики на тексте:    "),
+            (audio_metrics, "audio_metrics.json", "Метрики на аудио:     "),
+            (gap_metrics, "modality_gap.json", "Разрыв модальностей:  "),
+        ]
+        
+        for data, filename, label in outputs:
+            if data:
+                path = output_dir / filename
+                _dump_json(path, data)
+                print(f"✓ {label}{path}")
 # END:metrics_calculator
 
 
 # ANCHOR:main
 async def main():
     """Главная функция."""
+    # Загружаем переменные окружения (только при запуске, не при импорте модуля)
+    load_dotenv()
+    
     parser = argparse.ArgumentParser(description="Оценка качества голосового помощника")
     parser.add_argument(
         "--dataset",
@@ -513,40 +732,66 @@ async def main():
         default=None,
         help="Директория для сохранения результатов"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Число примеров, обрабатываемых одновременно"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Не использовать кэш результатов (полный пересчет всех примеров)"
+    )
     
     args = parser.parse_args()
     
-    # Создаем калькулятор
-    calculator = MetricsCalculator(args.dataset)
-    
-    text_metrics = None
-    audio_metrics = None
-    gap_metrics = None
-    
-    # Оцениваем на тексте
-    if args.modality in ["text", "both"]:
-        await calculator.evaluate_text_modality()
-        text_metrics = calculator.calculate_metrics(calculator.text_results)
-        calculator.print_metrics(text_metrics, "МЕТРИКИ НА ТЕКСТЕ")
-    
-    # Оцениваем на аудио
-    if args.modality in ["audio", "both"]:
-        await calculator.evaluate_audio_modality()
-        audio_metrics = calculator.calculate_metrics(calculator.audio_results)
-        calculator.print_metrics(audio_metrics, "МЕТРИКИ НА АУДИО")
-    
-    # Анализируем разрыв модальностей
-    if args.modality == "both" and text_metrics and audio_metrics:
-        gap_metrics = calculator.calculate_modality_gap(text_metrics, audio_metrics)
-        calculator.print_gap_metrics(gap_metrics)
-    
-    # Сохраняем результаты
-    calculator.save_results(
-        text_metrics=text_metrics,
-        audio_metrics=audio_metrics,
-        gap_metrics=gap_metrics,
-        output_dir=args.output
+    # Один пул соединений на весь прогон: keep-alive и TLS переиспользуются между примерами
+    limits = httpx.Limits(
+        max_connections=args.concurrency,
+        max_keepalive_connections=args.concurrency,
+        keepalive_expiry=60
     )
+    output_dir = Path(args.output) if args.output else Path(args.dataset).parent / "results"
+    
+    async with httpx.AsyncClient(limits=limits) as http_client:
+        # Создаем калькулятор
+        calculator = MetricsCalculator(
+            args.dataset,
+            concurrency=args.concurrency,
+            http_client=http_client,
+            cache_file=str(output_dir / ".eval_cache.json"),
+            use_cache=not args.no_cache
+        )
+        
+        text_metrics = None
+        audio_metrics = None
+        gap_metrics = None
+        
+        # Оцениваем на тексте
+        if args.modality in ["text", "both"]:
+            await calculator.evaluate_text_modality()
+            text_metrics = calculator.calculate_metrics(calculator.text_results)
+            calculator.print_metrics(text_metrics, "МЕТРИКИ НА ТЕКСТЕ")
+        
+        # Оцениваем на аудио
+        if args.modality in ["audio", "both"]:
+            await calculator.evaluate_audio_modality()
+            audio_metrics = calculator.calculate_metrics(calculator.audio_results)
+            calculator.print_metrics(audio_metrics, "МЕТРИКИ НА АУДИО")
+        
+        # Анализируем разрыв модальностей
+        if args.modality == "both" and text_metrics and audio_metrics:
+            gap_metrics = calculator.calculate_modality_gap(text_metrics, audio_metrics)
+            calculator.print_gap_metrics(gap_metrics)
+        
+        # Сохраняем результаты
+        calculator.save_results(
+            text_metrics=text_metrics,
+            audio_metrics=audio_metrics,
+            gap_metrics=gap_metrics,
+            output_dir=args.output
+        )
     
     print("\nГотово!")
 
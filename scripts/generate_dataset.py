@@ -4,14 +4,16 @@
 С поддержкой LLM перефразирования и двух текстов (text и text_for_tts).
 """
 
-import json
 import random
 import argparse
 import asyncio
 import sys
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import date as date_type, datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+
+import orjson
 
 # Добавляем путь к скриптам
 sys.path.insert(0, str(Path(__file__).parent))
@@ -161,6 +163,16 @@ NO_TOOL_TEMPLATES = [
     "Покажи рейсы в Париж",  # только Россия
 ]
 
+# Идентификаторы шаблонов (строка шаблона -> готовый template_id), форматируются один раз
+FLIGHT_TEMPLATE_IDS = {t: f"flight_template_{i+1:02d}" for i, t in enumerate(FLIGHT_TEMPLATES)}
+CALENDAR_ADD_TEMPLATE_IDS = {t: f"calendar_add_template_{i+1:02d}" for i, t in enumerate(CALENDAR_ADD_TEMPLATES)}
+CALENDAR_GET_TEMPLATE_IDS = {t: f"calendar_get_template_{i+1:02d}" for i, t in enumerate(CALENDAR_GET_TEMPLATES)}
+MUSIC_TEMPLATE_IDS = {t: f"music_template_{i+1:02d}" for i, t in enumerate(MUSIC_TEMPLATES)}
+NOTE_CREATE_TEMPLATE_IDS = {t: f"note_create_template_{i+1:02d}" for i, t in enumerate(NOTE_CREATE_TEMPLATES)}
+NOTE_SEARCH_TEMPLATE_IDS = {t: f"note_search_template_{i+1:02d}" for i, t in enumerate(NOTE_SEARCH_TEMPLATES)}
+# Для шаблонов без инструмента - по индексу шаблона
+NO_TOOL_TEMPLATE_IDS = [f"no_tool_template_{i+1:02d}" for i in range(len(NO_TOOL_TEMPLATES))]
+
 # Данные для генерации
 CITIES = [
     "Москва", "Санкт-Петербург", "Казань", "Екатеринбург",
@@ -192,9 +204,53 @@ NOTE_CONTENTS = [
     "подготовить отчет", "купить подарок", "забронировать отель",
     "проверить почту", "обновить резюме", "написать статью"
 ]
+# Первое слово заметки: заголовок при создании и запрос при поиске
+NOTE_TITLE_BY_CONTENT = {c: c.split(maxsplit=1)[0] for c in NOTE_CONTENTS}
+
+# Горизонт случайных дат в днях
+DATE_HORIZON_DAYS = 30
+
+WEEKDAYS_ACCUSATIVE = ["понедельник", "вторник", "среду", "четверг", "пятницу", "субботу", "воскресенье"]
 # END:templates
 
 
+def _no_tool_reason(text: str) -> str:
+    """Определить причину, по которой запрос не обслуживается инструментами."""
+    text = text.lower()
+    if any(word in text for word in ["поезд", "автобус", "электричка"]):
+        return "Поддерживаются только авиарейсы"
+    elif any(word in text for word in ["париж", "лондон", "берлин"]):
+        return "Поддерживаются только рейсы по России"
+    else:
+        return "Запрос не требует вызова инструмента"
+
+
+# Причины для шаблонов без инструмента (по индексу шаблона)
+NO_TOOL_REASONS = [_no_tool_reason(text) for text in NO_TOOL_TEMPLATES]
+
+
+def _template_complexity(template: str) -> str:
+    """Определить сложность шаблона по числу слов."""
+    word_count = len(template.split())
+    if word_count <= 7:
+        return "simple"
+    elif word_count <= 12:
+        return "medium"
+    else:
+        return "complex"
+
+
+# Сложность шаблонов с инструментом (строка шаблона -> сложность)
+TEMPLATE_COMPLEXITY = {
+    template: _template_complexity(template)
+    for templates in (
+        FLIGHT_TEMPLATES, CALENDAR_ADD_TEMPLATES, CALENDAR_GET_TEMPLATES,
+        MUSIC_TEMPLATES, NOTE_CREATE_TEMPLATES, NOTE_SEARCH_TEMPLATES
+    )
+    for template in templates
+}
+
+
 # ANCHOR:dataset_generator
 class DatasetGenerator:
     """Генератор тестового датасета с LLM перефразированием."""
@@ -204,7 +260,8 @@ class DatasetGenerator:
         output_dir: str = "data/datasets",
         seed: int = None,
         llm_provider = None,
-        use_llm_rephrase: bool = False
+        use_llm_rephrase: bool = False,
+        rephrase_concurrency: int = 16
     ):
         """
         Инициализация генератора.
@@ -214,39 +271,65 @@ class DatasetGenerator:
             seed: Seed для воспроизводимости.
             llm_provider: Провайдер LLM для перефразирования.
             use_llm_rephrase: Использовать ли LLM для перефразирования.
+            rephrase_concurrency: Максимальное число одновременных запросов к LLM
+                (общее для всех типов примеров, генерируемых параллельно).
         """
         self.output_dir = Path(output_dir)
+        self.rephrase_concurrency = rephrase_concurrency
+        # Один семафор на все генераторы: параллельные типы примеров делят
+        # rephrase_concurrency слотов, а не получают их каждый
+        self._rephrase_slots = asyncio.Semaphore(rephrase_concurrency)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.dataset: List[Dict[str, Any]] = []
         
-        if seed is not None:
-            random.seed(seed)
+        # Собственный генератор случайных чисел вместо глобального модуля random
+        self._rng = random.Random(seed)
         
         # Инициализируем перефразировщик
         self.use_llm_rephrase = use_llm_rephrase
         if use_llm_rephrase and llm_provider:
-            self.rephraser = TextRephraser(
-                llm_provider=llm_provider,
-                cache_file="data/datasets/.rephrase_cache.json"
-            )
+            # Кэшем перефразирований владеет генератор (см. _add_samples)
+            self.rephraser = TextRephraser(llm_provider=llm_provider, use_cache=False)
+            self._rephrase_cache_file = self.output_dir / ".rephrase_cache.json"
         else:
-            # Используем простой перефразировщик (правила)
+            # Используем простой перефразировщик (правила). Его результаты
+            # кэшируются только в памяти: на диске они устарели бы при смене правил
             self.rephraser = SimpleRephraser()
+            self._rephrase_cache_file = None
+        
+        # Базовый текст -> перефразированный текст
+        self._rephrase_cache: Dict[str, str] = {}
+        self._load_rephrase_cache()
         
         # Инициализируем конвертер дат
         self.date_converter = DateToTextConverter()
-    
-    def _get_random_date(self, days_ahead: int = 30) -> str:
-        """Получить случайную дату в будущем."""
-        days = random.randint(1, days_ahead)
-        date = datetime.now() + timedelta(days=days)
-        return date.strftime("%Y-%m-%d")
-    
-    def _get_date_description(self, date_str: str) -> str:
-        """Получить описание даты (завтра, послезавтра, конкретная дата)."""
-        date = datetime.strptime(date_str, "%Y-%m-%d")
+        
+        # Таблицы дат на горизонт генерации: смещение -> ISO дата -> описание.
+        # Строятся один раз вместо strptime/now() на каждый пример.
         today = datetime.now().date()
-        delta = (date.date() - today).days
+        self._today = today
+        self._dates = [
+            (today + timedelta(days=days)).strftime("%Y-%m-%d")
+            for days in range(1, DATE_HORIZON_DAYS + 1)
+        ]
+        self._date_descriptions = {
+            date_str: self._describe_date(today + timedelta(days=days), today)
+            for days, date_str in enumerate(self._dates, 1)
+        }
+    
+    @staticmethod
+    def _describe_date(date: date_type, today: date_type) -> str:
+        """
+        Получить описание даты (завтра, послезавтра, конкретная дата).
+        
+        Args:
+            date: Дата.
+            today: Сегодняшняя дата.
+            
+        Returns:
+            Описание даты.
+        """
+        delta = (date - today).days
         
         if delta == 1:
             return "завтра"
@@ -254,75 +337,163 @@ class DatasetGenerator:
             return "послезавтра"
         elif delta <= 7:
             # Используем день недели
-            weekdays = ["понедельник", "вторник", "среду", "четверг", "пятницу", "субботу", "воскресенье"]
-            return f"в {weekdays[date.weekday()]}"
+            return f"в {WEEKDAYS_ACCUSATIVE[date.weekday()]}"
         else:
-            return date_str
+            return date.strftime("%Y-%m-%d")
+    
+    def _draw_dates(self, count: int) -> Tuple[List[str], List[str]]:
+        """
+        Выбрать случайные даты в будущем и их описания в тексте.
+        
+        Args:
+            count: Количество дат.
+            
+        Returns:
+            Даты в формате ISO и их описания.
+        """
+        dates = self._rng.choices(self._dates, k=count)
+        rng_random = self._rng.random
+        
+        # Используем разные варианты дат: 70% - описательные, 30% - конкретные
+        date_descs = [
+            self._get_date_description(date) if rng_random() < 0.7 else date
+            for date in dates
+        ]
+        return dates, date_descs
+    
+    def _get_date_description(self, date_str: str) -> str:
+        """Получить описание даты (завтра, послезавтра, конкретная дата)."""
+        description = self._date_descriptions.get(date_str)
+        if description is None:
+            date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            description = self._describe_date(date, self._today)
+        return description
     
     def _get_complexity(self, template: str) -> str:
         """Определить сложность шаблона."""
-        if len(template.split()) <= 7:
-            return "simple"
-        elif len(template.split()) <= 12:
-            return "medium"
-        else:
-            return "complex"
+        return TEMPLATE_COMPLEXITY[template]
     
-    def _create_tts_text(
+    def _create_tts_texts(
         self,
-        text: str,
-        date_iso: str,
-        date_desc: str
-    ) -> str:
+        samples: List[Dict[str, Any]],
+        date_descs: List[str]
+    ) -> None:
         """
-        Создать текст для TTS с датами прописью.
+        Заполнить text_for_tts с датами прописью.
+        
+        Описательные даты (завтра, в пятницу) не содержат чисел и конвертером
+        не меняются, поэтому в него уходят только конкретные даты ISO.
         
         Args:
-            text: Исходный текст.
-            date_iso: Дата в формате ISO (YYYY-MM-DD).
-            date_desc: Описание даты в тексте.
-            
-        Returns:
-            Текст для TTS.
+            samples: Примеры с датой в params и перефразированным текстом.
+            date_descs: Описания дат в текстах примеров.
         """
-        return self.date_converter.convert_text_for_tts(text, date_iso, date_desc)
+        dated = [
+            (sample, date_desc)
+            for sample, date_desc in zip(samples, date_descs)
+            if date_desc == sample["params"]["date"]
+        ]
+        tts_texts = self.date_converter.convert_text_for_tts_batch([
+            (sample["text"], sample["params"]["date"], date_desc)
+            for sample, date_desc in dated
+        ])
+        
+        for (sample, _), text_for_tts in zip(dated, tts_texts):
+            sample["text_for_tts"] = text_for_tts
+    
+    def _load_rephrase_cache(self) -> None:
+        """Загрузить кэш перефразирований из файла."""
+        if self._rephrase_cache_file and self._rephrase_cache_file.exists():
+            try:
+                self._rephrase_cache = orjson.loads(self._rephrase_cache_file.read_bytes())
+                print(f"✓ Загружен кэш перефразирований: {len(self._rephrase_cache)} записей")
+            except Exception as e:
+                print(f"⚠️  Ошибка загрузки кэша: {e}")
+                self._rephrase_cache = {}
+    
+    def _save_rephrase_cache(self) -> None:
+        """Сохранить кэш перефразирований в файл."""
+        if self._rephrase_cache_file:
+            try:
+                self._rephrase_cache_file.write_bytes(
+                    orjson.dumps(self._rephrase_cache, option=orjson.OPT_INDENT_2)
+                )
+            except Exception as e:
+                print(f"⚠️  Ошибка сохранения кэша: {e}")
     
-    def _rephrase_sync(self, text: str) -> str:
-        """Синхронная обёртка для перефразирования."""
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self.rephraser.rephrase(text))
+    async def _add_samples(
+        self,
+        samples: List[Dict[str, Any]],
+        date_descs: Optional[List[str]] = None
+    ) -> None:
+        """
+        Добавить примеры в датасет и перефразировать их тексты одним батчем.
+        
+        Примеры попадают в датасет до перефразирования, поэтому порядок строк
+        не зависит от того, какой из параллельных генераторов закончит раньше.
+        
+        Args:
+            samples: Примеры, в поле "text" которых лежит базовый текст шаблона.
+            date_descs: Описания дат в текстах (для примеров с датой в params).
+        """
+        self.dataset.extend(samples)
+        cache = self._rephrase_cache
+        
+        # В перефразировщик уходят только уникальные тексты, которых нет в кэше
+        misses = list(dict.fromkeys(
+            sample["text"] for sample in samples if sample["text"] not in cache
+        ))
+        if misses:
+            rephrased = await self.rephraser.rephrase_batch(
+                misses,
+                batch_size=self.rephrase_concurrency,
+                show_progress=self.use_llm_rephrase,
+                semaphore=self._rephrase_slots
+            )
+            cache.update(zip(misses, rephrased))
+        
+        for sample in samples:
+            text = cache[sample["text"]]
+            sample["text"] = text
+            sample["text_for_tts"] = text
+        
+        # Создаём текст для TTS (без дат text_for_tts = text)
+        if date_descs is not None:
+            self._create_tts_texts(samples, date_descs)
     
-    def generate_flight_samples(self, count: int = 200) -> None:
+    async def generate_flight_samples(self, count: int = 200) -> None:
         """Генерировать примеры для расписания рейсов."""
-        for i in range(count):
-            template = random.choice(FLIGHT_TEMPLATES)
-            from_city = random.choice(CITIES)
-            to_city = random.choice([c for c in CITIES if c != from_city])
-            date = self._get_random_date()
-            
-            # Используем разные варианты дат
-            if random.random() < 0.7:  # 70% - описательные даты
-                date_desc = self._get_date_description(date)
-            else:  # 30% - конкретные даты
-                date_desc = date
-            
-            # Генерируем базовый текст
+        samples = []
+        # Атрибуты, нужные в цикле, читаем один раз
+        llm_rephrased = self.use_llm_rephrase
+        get_complexity = self._get_complexity
+        
+        # Все случайные величины выбираются сразу для всех примеров
+        templates = self._rng.choices(FLIGHT_TEMPLATES, k=count)
+        from_cities = self._rng.choices(CITIES, k=count)
+        to_cities = self._rng.choices(CITIES, k=count)
+        dates, date_descs = self._draw_dates(count)
+        
+        # Город назначения перевыбираем только при совпадении (~5% примеров)
+        choice = self._rng.choice
+        for i, from_city in enumerate(from_cities):
+            while to_cities[i] == from_city:
+                to_cities[i] = choice(CITIES)
+        
+        for i, (template, from_city, to_city, date, date_desc) in enumerate(
+            zip(templates, from_cities, to_cities, dates, date_descs)
+        ):
+            # Генерируем базовый текст (перефразируется ниже одним батчем)
             base_text = template.format(
                 from_city=from_city,
                 to_city=to_city,
                 date=date_desc
             )
             
-            # Перефразируем
-            text = self._rephrase_sync(base_text)
-            
-            # Создаём текст для TTS
-            text_for_tts = self._create_tts_text(text, date, date_desc)
-            
-            self.dataset.append({
+            samples.append({
                 "id": f"flight_{i+1:03d}",
-                "text": text,
-                "text_for_tts": text_for_tts,
+                "text": base_text,
+                "text_for_tts": None,
                 "tool": "flight_schedule",
                 "params": {
                     "from_city": from_city,
@@ -330,222 +501,213 @@ class DatasetGenerator:
                     "date": date
                 },
                 "metadata": {
-                    "template_id": f"flight_template_{FLIGHT_TEMPLATES.index(template)+1:02d}",
-                    "complexity": self._get_complexity(template),
+                    "template_id": FLIGHT_TEMPLATE_IDS[template],
+                    "complexity": get_complexity(template),
                     "language": "ru",
-                    "llm_rephrased": self.use_llm_rephrase
+                    "llm_rephrased": llm_rephrased
                 }
             })
+        
+        await self._add_samples(samples, date_descs)
     
-    def generate_calendar_samples(self, count: int = 200) -> None:
+    async def generate_calendar_samples(self, count: int = 200) -> None:
         """Генерировать примеры для календаря."""
+        samples = []
+        # Атрибуты, нужные в цикле, читаем один раз
+        llm_rephrased = self.use_llm_rephrase
+        get_complexity = self._get_complexity
+        half = count // 2
+        
         # Добавление событий
-        for i in range(count // 2):
-            template = random.choice(CALENDAR_ADD_TEMPLATES)
-            description = random.choice(MEETING_DESCRIPTIONS)
-            date = self._get_random_date()
-            
-            if random.random() < 0.7:
-                date_desc = self._get_date_description(date)
-            else:
-                date_desc = date
-            
+        templates = self._rng.choices(CALENDAR_ADD_TEMPLATES, k=half)
+        descriptions = self._rng.choices(MEETING_DESCRIPTIONS, k=half)
+        dates, add_date_descs = self._draw_dates(half)
+        
+        for i, (template, description, date, date_desc) in enumerate(
+            zip(templates, descriptions, dates, add_date_descs)
+        ):
             base_text = template.format(
                 description=description,
                 date=date_desc
             )
             
-            # Перефразируем
-            text = self._rephrase_sync(base_text)
-            
-            # Создаём текст для TTS
-            text_for_tts = self._create_tts_text(text, date, date_desc)
-            
-            self.dataset.append({
+            samples.append({
                 "id": f"calendar_add_{i+1:03d}",
-                "text": text,
-                "text_for_tts": text_for_tts,
+                "text": base_text,
+                "text_for_tts": None,
                 "tool": "add_calendar_event",
                 "params": {
                     "date": date,
                     "description": description
                 },
                 "metadata": {
-                    "template_id": f"calendar_add_template_{CALENDAR_ADD_TEMPLATES.index(template)+1:02d}",
-                    "complexity": self._get_complexity(template),
+                    "template_id": CALENDAR_ADD_TEMPLATE_IDS[template],
+                    "complexity": get_complexity(template),
                     "language": "ru",
-                    "llm_rephrased": self.use_llm_rephrase
+                    "llm_rephrased": llm_rephrased
                 }
             })
         
         # Получение событий
-        for i in range(count // 2):
-            template = random.choice(CALENDAR_GET_TEMPLATES)
-            date = self._get_random_date()
-            
-            if random.random() < 0.7:
-                date_desc = self._get_date_description(date)
-            else:
-                date_desc = date
-            
+        templates = self._rng.choices(CALENDAR_GET_TEMPLATES, k=half)
+        dates, get_date_descs = self._draw_dates(half)
+        
+        for i, (template, date, date_desc) in enumerate(zip(templates, dates, get_date_descs)):
             base_text = template.format(date=date_desc)
             
-            # Перефразируем
-            text = self._rephrase_sync(base_text)
-            
-            # Создаём текст для TTS
-            text_for_tts = self._create_tts_text(text, date, date_desc)
-            
-            self.dataset.append({
+            samples.append({
                 "id": f"calendar_get_{i+1:03d}",
-                "text": text,
-                "text_for_tts": text_for_tts,
+                "text": base_text,
+                "text_for_tts": None,
                 "tool": "get_calendar_events",
                 "params": {
                     "date": date
                 },
                 "metadata": {
-                    "template_id": f"calendar_get_template_{CALENDAR_GET_TEMPLATES.index(template)+1:02d}",
-                    "complexity": self._get_complexity(template),
+                    "template_id": CALENDAR_GET_TEMPLATE_IDS[template],
+                    "complexity": get_complexity(template),
                     "language": "ru",
-                    "llm_rephrased": self.use_llm_rephrase
+                    "llm_rephrased": llm_rephrased
                 }
             })
+        
+        await self._add_samples(samples, add_date_descs + get_date_descs)
     
-    def generate_music_samples(self, count: int = 100) -> None:
+    async def generate_music_samples(self, count: int = 100) -> None:
         """Генерировать примеры для поиска музыки."""
-        for i in range(count):
-            template = random.choice(MUSIC_TEMPLATES)
-            query = random.choice(MUSIC_QUERIES)
-            
+        samples = []
+        # Атрибуты, нужные в цикле, читаем один раз
+        llm_rephrased = self.use_llm_rephrase
+        get_complexity = self._get_complexity
+        
+        templates = self._rng.choices(MUSIC_TEMPLATES, k=count)
+        queries = self._rng.choices(MUSIC_QUERIES, k=count)
+        # Тип поиска для запросов, по которым он не определяется
+        random_search_types = self._rng.choices(["track", "artist"], k=count)
+        
+        for i, (template, query) in enumerate(zip(templates, queries)):
             base_text = template.format(query=query)
             
-            # Перефразируем
-            text = self._rephrase_sync(base_text)
-            
-            # Для музыки text_for_tts = text (нет дат)
-            text_for_tts = text
-            
             # Определяем тип поиска
             if " - " in query:
                 search_type = "track"
             elif any(word in query.lower() for word in ["альбом", "album"]):
                 search_type = "album"
             else:
-                search_type = random.choice(["track", "artist"])
+                search_type = random_search_types[i]
             
-            self.dataset.append({
+            samples.append({
                 "id": f"music_{i+1:03d}",
-                "text": text,
-                "text_for_tts": text_for_tts,
+                "text": base_text,
+                "text_for_tts": None,
                 "tool": "search_music",
                 "params": {
                     "query": query,
                     "search_type": search_type
                 },
                 "metadata": {
-                    "template_id": f"music_template_{MUSIC_TEMPLATES.index(template)+1:02d}",
-                    "complexity": self._get_complexity(template),
+                    "template_id": MUSIC_TEMPLATE_IDS[template],
+                    "complexity": get_complexity(template),
                     "language": "ru",
-                    "llm_rephrased": self.use_llm_rephrase
+                    "llm_rephrased": llm_rephrased
                 }
             })
+        
+        # Для музыки text_for_tts = text (нет дат)
+        await self._add_samples(samples)
     
-    def generate_notes_samples(self, count: int = 100) -> None:
+    async def generate_notes_samples(self, count: int = 100) -> None:
         """Генерировать примеры для заметок."""
+        samples = []
+        # Атрибуты, нужные в цикле, читаем один раз
+        llm_rephrased = self.use_llm_rephrase
+        get_complexity = self._get_complexity
+        
+        half = count // 2
+        
         # Создание заметок
-        for i in range(count // 2):
-            template = random.choice(NOTE_CREATE_TEMPLATES)
-            content = random.choice(NOTE_CONTENTS)
-            
+        templates = self._rng.choices(NOTE_CREATE_TEMPLATES, k=half)
+        contents = self._rng.choices(NOTE_CONTENTS, k=half)
+        
+        for i, (template, content) in enumerate(zip(templates, contents)):
             base_text = template.format(content=content)
             
-            # Перефразируем
-            text = self._rephrase_sync(base_text)
-            
-            # Для заметок text_for_tts = text (нет дат)
-            text_for_tts = text
-            
-            self.dataset.append({
+            samples.append({
                 "id": f"note_create_{i+1:03d}",
-                "text": text,
-                "text_for_tts": text_for_tts,
+                "text": base_text,
+                "text_for_tts": None,
                 "tool": "create_note",
                 "params": {
-                    "title": content.split()[0],
+                    "title": NOTE_TITLE_BY_CONTENT[content],
                     "content": content
                 },
                 "metadata": {
-                    "template_id": f"note_create_template_{NOTE_CREATE_TEMPLATES.index(template)+1:02d}",
-                    "complexity": self._get_complexity(template),
+                    "template_id": NOTE_CREATE_TEMPLATE_IDS[template],
+                    "complexity": get_complexity(template),
                     "language": "ru",
-                    "llm_rephrased": self.use_llm_rephrase
+                    "llm_rephrased": llm_rephrased
                 }
             })
         
         # Поиск заметок
-        for i in range(count // 2):
-            template = random.choice(NOTE_SEARCH_TEMPLATES)
-            query = random.choice(NOTE_CONTENTS).split()[0]
+        templates = self._rng.choices(NOTE_SEARCH_TEMPLATES, k=half)
+        contents = self._rng.choices(NOTE_CONTENTS, k=half)
+        
+        for i, (template, content) in enumerate(zip(templates, contents)):
+            query = NOTE_TITLE_BY_CONTENT[content]
             
             base_text = template.format(query=query)
             
-            # Перефразируем
-            text = self._rephrase_sync(base_text)
-            
-            # Для заметок text_for_tts = text (нет дат)
-            text_for_tts = text
-            
-            self.dataset.append({
+            samples.append({
                 "id": f"note_search_{i+1:03d}",
-                "text": text,
-                "text_for_tts": text_for_tts,
+                "text": base_text,
+                "text_for_tts": None,
                 "tool": "search_notes",
                 "params": {
                     "query": query
                 },
                 "metadata": {
-                    "template_id": f"note_search_template_{NOTE_SEARCH_TEMPLATES.index(template)+1:02d}",
-                    "complexity": self._get_complexity(template),
+                    "template_id": NOTE_SEARCH_TEMPLATE_IDS[template],
+                    "complexity": get_complexity(template),
                     "language": "ru",
-                    "llm_rephrased": self.use_llm_rephrase
+                    "llm_rephrased": llm_rephrased
                 }
             })
+        
+        # Для заметок text_for_tts = text (нет дат)
+        await self._add_samples(samples)
     
     def generate_no_tool_samples(self, count: int = 100) -> None:
         """Генерировать примеры без инструмента."""
-        for i in range(count):
-            text = random.choice(NO_TOOL_TEMPLATES)
+        indices = self._rng.choices(range(len(NO_TOOL_TEMPLATES)), k=count)
+        samples = []
+        
+        for i, idx in enumerate(indices):
+            text = NO_TOOL_TEMPLATES[idx]
             
             # Для примеров без инструмента text_for_tts = text
             text_for_tts = text
             
-            # Определяем причину
-            if any(word in text.lower() for word in ["поезд", "автобус", "электричка"]):
-                reason = "Поддерживаются только авиарейсы"
-            elif any(word in text.lower() for word in ["париж", "лондон", "берлин"]):
-                reason = "Поддерживаются только рейсы по России"
-            else:
-                reason = "Запрос не требует вызова инструмента"
-            
-            self.dataset.append({
+            samples.append({
                 "id": f"no_tool_{i+1:03d}",
                 "text": text,
                 "text_for_tts": text_for_tts,
                 "tool": "no_tool_available",
                 "params": {
-                    "reason": reason,
+                    "reason": NO_TOOL_REASONS[idx],
                     "user_message": "Извините, я не могу помочь с этим запросом"
                 },
                 "metadata": {
-                    "template_id": f"no_tool_template_{NO_TOOL_TEMPLATES.index(text)+1:02d}",
+                    "template_id": NO_TOOL_TEMPLATE_IDS[idx],
                     "complexity": "simple",
                     "language": "ru",
                     "llm_rephrased": False
                 }
             })
+        
+        self.dataset.extend(samples)
     
-    def generate_full_dataset(
+    async def generate_full_dataset(
         self,
         flights: int = 200,
         calendar: int = 200,
@@ -570,23 +732,29 @@ class DatasetGenerator:
             print("✓ Используется простой перефразировщик (правила)")
         print()
         
-        self.generate_flight_samples(flights)
+        # Генераторы выбирают шаблоны до первого await, поэтому случайная
+        # последовательность та же, что и при последовательном запуске.
+        # Выигрыш только при LLM: ожидание ответов разных типов перекрывается
+        # (в пределах общего семафора). Правила выполняются синхронно, и там
+        # генераторы всё равно идут один за другим
+        await asyncio.gather(
+            self.generate_flight_samples(flights),
+            self.generate_calendar_samples(calendar),
+            self.generate_music_samples(music),
+            self.generate_notes_samples(notes),
+        )
         print(f"✓ Сгенерировано {flights} примеров для рейсов")
-        
-        self.generate_calendar_samples(calendar)
         print(f"✓ Сгенерировано {calendar} примеров для календаря")
-        
-        self.generate_music_samples(music)
         print(f"✓ Сгенерировано {music} примеров для музыки")
-        
-        self.generate_notes_samples(notes)
         print(f"✓ Сгенерировано {notes} примеров для заметок")
         
         self.generate_no_tool_samples(no_tool)
         print(f"✓ Сгенерировано {no_tool} примеров без инструмента")
         
+        self._save_rephrase_cache()
+        
         # Перемешиваем датасет
-        random.shuffle(self.dataset)
+        self._rng.shuffle(self.dataset)
         
         print(f"\nВсего примеров: {len(self.dataset)}")
     
@@ -599,22 +767,23 @@ class DatasetGenerator:
         """
         output_path = self.output_dir / filename
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.dataset, f, ensure_ascii=False, indent=2)
+        # Пишем по одному примеру через буфер, не собирая весь датасет
+        # в одну строку байтов; формат тот же, что у dumps(OPT_INDENT_2)
+        with open(output_path, 'wb', buffering=1 << 20) as f:
+            f.write(b"[")
+            separator = b"\n  "
+            for sample in self.dataset:
+                f.write(separator)
+                f.write(orjson.dumps(sample, option=orjson.OPT_INDENT_2).replace(b"\n", b"\n  "))
+                separator = b",\n  "
+            f.write(b"\n]" if self.dataset else b"]")
         
         print(f"\n✓ Датасет сохранен в {output_path}")
     
     def print_statistics(self) -> None:
         """Вывести статистику датасета."""
-        tool_counts = {}
-        complexity_counts = {}
-        
-        for item in self.dataset:
-            tool = item['tool']
-            complexity = item['metadata']['complexity']
-            
-            tool_counts[tool] = tool_counts.get(tool, 0) + 1
-            complexity_counts[complexity] = complexity_counts.get(complexity, 0) + 1
+        tool_counts = Counter(item['tool'] for item in self.dataset)
+        complexity_counts = Counter(item['metadata']['complexity'] for item in self.dataset)
         
         print("\n" + "="*60)
         print("СТАТИСТИКА ДАТАСЕТА")
@@ -708,14 +877,14 @@ def main():
         use_llm_rephrase=args.use_llm_rephrase
     )
     
-    # Генерируем датасет
-    generator.generate_full_dataset(
+    # Генерируем датасет (все перефразирования идут в одном цикле событий)
+    asyncio.run(generator.generate_full_dataset(
         flights=flights,
         calendar=calendar,
         music=music,
         notes=notes,
         no_tool=no_tool
-    )
+    ))
     
     # Выводим статистику
     generator.print_statistics()
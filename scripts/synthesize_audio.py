@@ -5,13 +5,16 @@
 
 import json
 import argparse
+import numpy as np
 import torch
+import torchaudio
 import soundfile
-import librosa
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from qwen_tts.inference.qwen3_tts_model import Qwen3TTSModel
+import orjson
 from tqdm import tqdm
 
 
@@ -22,7 +25,10 @@ class Qwen3TTSSynthesizer:
     def __init__(
         self,
         model_name: str = "Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign",
-        device: str = None
+        device: str = None,
+        compile_model: bool = False,
+        attn_implementation: Optional[str] = None,
+        quantization: Optional[str] = None
     ):
         """
         Инициализация синтезатора.
@@ -30,8 +36,14 @@ class Qwen3TTSSynthesizer:
         Args:
             model_name: Имя модели на Hugging Face.
             device: Устройство для вычислений (cuda/cpu).
+            compile_model: Компилировать декодер через torch.compile.
+            attn_implementation: Реализация внимания (например, flash_attention_2).
+            quantization: Квантизация весов через bitsandbytes (8bit/4bit).
         """
         self.model_name = model_name
+        self.compile_model = compile_model
+        self.attn_implementation = attn_implementation
+        self.quantization = quantization
         
         if device is None:
             self.device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -39,8 +51,19 @@ class Qwen3TTSSynthesizer:
             self.device = device
         
         print(f"Используется устройство: {self.device}")
+        if self.device.startswith("cuda"):
+            # Длины входов меняются от батча к батчу: автоподбор cuDNN только мешает
+            torch.backends.cudnn.benchmark = False
+            # Операции, оставшиеся в float32, считаются на тензорных ядрах (TF32)
+            torch.set_float32_matmul_precision('high')
         self.model = None
         self.sample_rate = 16000
+        # Ресемплеры по исходной частоте: ядро фильтра строится один раз
+        self._resamplers: Dict[int, torchaudio.transforms.Resample] = {}
+        
+        # Ресемплинг и запись файлов идут в фоне, пока модель генерирует следующий батч
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        self._pending: Dict[str, Future] = {}
 
     def _init_model(self):
         """Инициализировать модель TTS."""
@@ -49,23 +72,158 @@ class Qwen3TTSSynthesizer:
         
         try:
             print(f"Загрузка модели: {self.model_name}")
+            dtype = torch.bfloat16 if self.device.startswith("cuda") else torch.float32
+            
+            load_kwargs = {}
+            if self.attn_implementation:
+                load_kwargs["attn_implementation"] = self.attn_implementation
+            if self.quantization:
+                from transformers import BitsAndBytesConfig
+                
+                if self.quantization == "8bit":
+                    load_kwargs["quantization_config"] = BitsAndBytesConfig(load_in_8bit=True)
+                elif self.quantization == "4bit":
+                    load_kwargs["quantization_config"] = BitsAndBytesConfig(
+                        load_in_4bit=True,
+                        bnb_4bit_quant_type="nf4",
+                        bnb_4bit_compute_dtype=dtype
+                    )
+                else:
+                    raise ValueError(f"Неизвестная квантизация: {self.quantization}")
+            
             self.model = Qwen3TTSModel.from_pretrained(
                 self.model_name,
                 device_map=self.device,
                 trust_remote_code=True,
-                dtype=torch.bfloat16 if self.device == "cuda" else torch.float32
+                dtype=dtype,
+                **load_kwargs
             )
             
             print("✓ Модель загружена")
             
+            if self.compile_model:
+                self._compile()
+            
         except ImportError:
             print("❌ Ошибка: библиотека transformers не установлена")
             print("Установите: pip install transformers torch qwen-tts")
+            print("Для --quantization нужен bitsandbytes, для flash_attention_2 - flash-attn")
             raise
         except Exception as e:
             print(f"❌ Ошибка загрузки модели: {e}")
             raise
     
+    def _compile(self):
+        """Скомпилировать forward авторегрессионного декодера (talker)."""
+        print("Компиляция модели (torch.compile)...")
+        talker = self.model.model.talker
+        # Длина последовательности растёт на каждом шаге декодирования,
+        # поэтому компилируем с динамическими размерностями
+        talker.forward = torch.compile(talker.forward, dynamic=True)
+        
+        # Разогрев: платим за компиляцию один раз до основного цикла
+        self.model.generate_voice_design(
+            text="Разогрев модели",
+            language='Russian',
+            instruct='',
+        )
+        print("✓ Модель скомпилирована")
+    
+    def _release_cuda_cache(self, min_free_ratio: float = 0.1) -> None:
+        """
+        Вернуть закэшированную память CUDA, если свободной осталось мало.
+        
+        Args:
+            min_free_ratio: Доля свободной памяти, ниже которой чистим кэш.
+        """
+        if not self.device.startswith("cuda"):
+            return
+        
+        free, total = torch.cuda.mem_get_info(self.device)
+        if free < min_free_ratio * total:
+            torch.cuda.empty_cache()
+    
+    def _resample(self, audio: np.ndarray, sr: int) -> np.ndarray:
+        """
+        Привести аудио к частоте дискретизации синтезатора.
+        
+        Args:
+            audio: Аудио от модели (одномерный массив).
+            sr: Исходная частота дискретизации.
+            
+        Returns:
+            Аудио с частотой self.sample_rate.
+        """
+        if sr == self.sample_rate:
+            return audio
+        
+        resampler = self._resamplers.get(sr)
+        if resampler is None:
+            resampler = torchaudio.transforms.Resample(sr, self.sample_rate)
+            self._resamplers[sr] = resampler
+        
+        # Декодер модели возвращает аудио на CPU, поэтому и ресемплируем на CPU
+        with torch.inference_mode():
+            return resampler(torch.from_numpy(audio)).numpy()
+    
+    def _save(self, output_path: str, audio: np.ndarray, sr: int) -> None:
+        """
+        Ресемплировать аудио и записать его в WAV (16-bit PCM).
+        
+        Args:
+            output_path: Путь для сохранения аудио.
+            audio: Аудио от модели.
+            sr: Исходная частота дискретизации.
+        """
+        audio = self._resample(audio, sr)
+        soundfile.write(
+            output_path,
+            audio,
+            samplerate=self.sample_rate,
+            format="WAV",
+            subtype="PCM_16"
+        )
+    
+    def _wait_write(self, output_path: str) -> bool:
+        """
+        Дождаться записи одного аудио файла.
+        
+        Args:
+            output_path: Путь к аудио файлу.
+            
+        Returns:
+            True если файл записан, False иначе.
+        """
+        future = self._pending.pop(output_path, None)
+        if future is None:
+            return True
+        
+        try:
+            future.result()
+            return True
+        except Exception as e:
+            # tqdm.write печатает над прогресс-баром, не разрывая его
+            tqdm.write(f"❌ Ошибка сохранения аудио {output_path}: {e}")
+            return False
+    
+    def wait_writes(self, output_paths: Optional[List[str]] = None) -> List[str]:
+        """
+        Дождаться записи аудио файлов, поставленных в очередь.
+        
+        Args:
+            output_paths: Пути файлов (по умолчанию все ожидающие записи).
+            
+        Returns:
+            Пути файлов, которые не удалось записать.
+        """
+        if output_paths is None:
+            output_paths = list(self._pending)
+        return [
+            output_path
+            for output_path in output_paths
+            if not self._wait_write(output_path)
+        ]
+    
     def synthesize(
         self,
         text: str,
@@ -83,32 +241,67 @@ class Qwen3TTSSynthesizer:
         Returns:
             True если успешно, False иначе.
         """
+        if not self.synthesize_batch([text], [output_path], [instruct])[0]:
+            return False
+        return self._wait_write(output_path)
+    
+    def synthesize_batch(
+        self,
+        texts: List[str],
+        output_paths: List[str],
+        instructs: List[str],
+    ) -> List[bool]:
+        """
+        Синтезировать аудио для нескольких текстов одним вызовом модели.
+        
+        Модель сама дополняет входы батча до общей длины, поэтому выгоднее
+        подавать тексты близкой длины.
+        
+        Args:
+            texts: Тексты для синтеза.
+            output_paths: Пути для сохранения аудио (по одному на текст).
+            instructs: Инструкции для синтеза голоса (по одной на текст).
+
+        Returns:
+            Для каждого текста: True если аудио сгенерировано, False иначе.
+            Файлы записываются в фоне, ошибки записи возвращает wait_writes().
+        """
         try:
             self._init_model()
             
-            # Генерация аудио
-            audio, sr = self.model.generate_voice_design(
-                text = text,
-                language='Russian',
-                instruct=instruct,
-            )
-
-            # Сохранение аудио
-            if audio is not None:
-                audio = librosa.resample(
-                    audio[0],
-                    orig_sr=sr,
-                    target_sr=self.sample_rate
+            # Генерация аудио (inference_mode строже no_grad: без учёта версий тензоров)
+            with torch.inference_mode():
+                audios, sr = self.model.generate_voice_design(
+                    text=texts,
+                    language='Russian',
+                    instruct=instructs,
                 )
-                soundfile.write(output_path, audio, samplerate=self.sample_rate, format="WAV")
-                return True
-            else:
-                print(f"⚠️  Не удалось извлечь аудио для: {text[:50]}...")
-                return False
-                
+            self._release_cuda_cache()
         except Exception as e:
-            print(f"❌ Ошибка синтеза для '{text[:50]}...': {e}")
-            return False
+            if len(texts) == 1:
+                tqdm.write(f"❌ Ошибка синтеза для '{texts[0][:50]}...': {e}")
+                return [False]
+            # Повторяем по одному, чтобы один плохой текст не ронял весь батч
+            tqdm.write(f"❌ Ошибка синтеза батча из {len(texts)} текстов: {e}")
+            return [
+                self.synthesize(text, output_path, instruct)
+                for text, output_path, instruct in zip(texts, output_paths, instructs)
+            ]
+        
+        # Сохранение аудио (файлы пишутся в фоне после возврата всего батча)
+        results = []
+        for text, output_path, audio in zip(texts, output_paths, audios):
+            if audio is None:
+                tqdm.write(f"⚠️  Не удалось извлечь аудио для: {text[:50]}...")
+                results.append(False)
+                continue
+            
+            self._pending[output_path] = self._io_pool.submit(self._save, output_path, audio, sr)
+            results.append(True)
+        
+        # Если модель вернула меньше аудио, чем текстов, остаток считаем ошибкой
+        results.extend([False] * (len(texts) - len(results)))
+        return results
 # END:qwen3_tts_synthesizer
 
 
@@ -122,6 +315,9 @@ class AudioSynthesizer:
         output_dir: str = "data/datasets/audio",
         model_name: str = "Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign",
         device: str = None,
+        compile_model: bool = False,
+        attn_implementation: Optional[str] = None,
+        quantization: Optional[str] = None,
     ):
         """
         Инициализация синтезатора.
@@ -131,33 +327,121 @@ class AudioSynthesizer:
             output_dir: Директория для сохранения аудио файлов.
             model_name: Имя модели TTS.
             device: Устройство для вычислений.
+            compile_model: Компилировать модель TTS через torch.compile.
+            attn_implementation: Реализация внимания в модели TTS.
+            quantization: Квантизация весов модели TTS (8bit/4bit).
         """
         self.dataset_path = Path(dataset_path)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         # Загружаем датасет
-        with open(self.dataset_path, 'r', encoding='utf-8') as f:
-            self.dataset: List[Dict] = json.load(f)
+        self.dataset: List[Dict] = orjson.loads(self.dataset_path.read_bytes())
         
         print(f"Загружен датасет: {len(self.dataset)} примеров")
         
         # Инициализируем TTS
-        self.tts = Qwen3TTSSynthesizer(model_name=model_name, device=device)
+        self.tts = Qwen3TTSSynthesizer(
+            model_name=model_name,
+            device=device,
+            compile_model=compile_model,
+            attn_implementation=attn_implementation,
+            quantization=quantization
+        )
+    
+    def _load_progress(self, progress_path: Path) -> Dict[str, Dict]:
+        """
+        Загрузить примеры, синтезированные в прерванном запуске.
+        
+        Args:
+            progress_path: Путь к журналу прогресса (JSON Lines).
+            
+        Returns:
+            Словарь id -> запись для примеров, аудио которых есть на диске.
+        """
+        done = {}
+        if not progress_path.exists():
+            return done
+        
+        with open(progress_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    # Строка, недописанная при сбое
+                    continue
+                if item.get('audio_synthesized') and Path(item['audio_path']).exists():
+                    done[item['id']] = item
+        
+        return done
+    
+    def _record_progress(self, items: List[Dict], progress_file) -> None:
+        """
+        Дождаться записи аудио для примеров и добавить их в журнал прогресса.
+        
+        Примеры, аудио которых не удалось записать, помечаются как несинтезированные.
+        
+        Args:
+            items: Примеры батча (уже обновлённые результатами синтеза).
+            progress_file: Открытый на дозапись журнал прогресса.
+        """
+        failed_paths = set(self.tts.wait_writes(
+            [item['audio_path'] for item in items if item['audio_synthesized']]
+        ))
+        
+        for item in items:
+            if item['audio_path'] in failed_paths:
+                item['audio_path'] = None
+                item['audio_synthesized'] = False
+            progress_file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        progress_file.flush()
+    
+    @property
+    def output_path(self) -> Path:
+        """Путь к итоговому датасету с аудио."""
+        return self.dataset_path.parent / f"{self.dataset_path.stem}_with_audio.json"
+    
+    def _progress_path(self, rank: int = 0, world_size: int = 1) -> Path:
+        """
+        Путь к журналу прогресса (JSON Lines) процесса.
+        
+        Args:
+            rank: Номер процесса.
+            world_size: Количество процессов.
+            
+        Returns:
+            Путь к журналу.
+        """
+        if world_size == 1:
+            return self.output_path.with_suffix('.jsonl')
+        return self.output_path.with_suffix(f'.rank{rank}.jsonl')
     
-    def synthesize_all(self, alternate_speakers: bool = True) -> None:
+    def synthesize_all(
+        self,
+        alternate_speakers: bool = True,
+        batch_size: int = 8,
+        rank: int = 0,
+        world_size: int = 1
+    ) -> None:
         """
         Синтезировать аудио для всех примеров в датасете.
         
+        При world_size > 1 обрабатывается только доля примеров rank::world_size,
+        результат остаётся в журнале процесса и собирается merge_shards().
+        
         Args:
             alternate_speakers: Чередовать голоса для разнообразия.
+            batch_size: Количество текстов в одном вызове модели.
+            rank: Номер процесса.
+            world_size: Количество процессов.
         """
         print(f"\nСинтез аудио для {len(self.dataset)} примеров...")
         print(f"Выходная директория: {self.output_dir}")
         
-        updated_dataset = []
-        success_count = 0
-        fail_count = 0
+        # Журнал прогресса: по строке JSON на пример, для продолжения после сбоя
+        progress_path = self._progress_path(rank, world_size)
+        done = self._load_progress(progress_path)
+        skipped = 0
 
         instructs = [
             'Используй мягкий тон. Говори спокойно',
@@ -165,49 +449,110 @@ class AudioSynthesizer:
             'Используй мужской голос'
         ]
 
-        for idx, item in enumerate(tqdm(self.dataset, desc="Синтез аудио")):
-            item_id = item['id']
-            
+        # Задания на синтез: (индекс в датасете, текст, путь к аудио, голос)
+        jobs = []
+        for idx in range(rank, len(self.dataset), world_size):
+            item = self.dataset[idx]
             # Используем text_for_tts если доступен, иначе text
             text = item.get('text_for_tts', item['text'])
             
+            # Пример уже синтезирован в прошлом запуске
+            previous = done.get(item['id'])
+            if previous is not None and previous.get('text_for_tts', previous['text']) == text:
+                item['audio_path'] = previous['audio_path']
+                item['audio_synthesized'] = True
+                skipped += 1
+                continue
+            
             # Путь к аудио файлу
-            audio_filename = f"{item_id}.wav"
-            audio_path = self.output_dir / audio_filename
+            audio_path = self.output_dir / f"{item['id']}.wav"
             
             # Чередуем голоса для разнообразия
             instruct = instructs[idx % 3] if alternate_speakers else instructs[0]
             
-            try:
-                # Синтезируем аудио
-                success = self.tts.synthesize(
-                    text=text,
-                    output_path=str(audio_path),
-                    instruct=instruct
-                )
+            jobs.append((idx, text, str(audio_path), instruct))
+        
+        if skipped:
+            print(f"Пропущено (синтезированы ранее): {skipped}")
+        
+        # Группируем тексты близкой длины, чтобы в батче было меньше дополнения
+        jobs.sort(key=lambda job: len(job[1]))
+        
+        with open(progress_path, 'a', encoding='utf-8') as progress_file, \
+                tqdm(total=len(jobs), desc="Синтез аудио", position=rank) as progress:
+            # Примеры предыдущего батча: их файлы дописываются, пока идёт генерация
+            previous_batch: List[Dict] = []
+            
+            for start in range(0, len(jobs), batch_size):
+                batch = jobs[start:start + batch_size]
                 
-                if success:
-                    # Обновляем запись в датасете
-                    item['audio_path'] = str(audio_path)
-                    item['audio_synthesized'] = True
-                    success_count += 1
-                else:
-                    item['audio_path'] = None
-                    item['audio_synthesized'] = False
-                    fail_count += 1
+                try:
+                    # Синтезируем аудио
+                    results = self.tts.synthesize_batch(
+                        texts=[text for _, text, _, _ in batch],
+                        output_paths=[audio_path for _, _, audio_path, _ in batch],
+                        instructs=[instruct for _, _, _, instruct in batch]
+                    )
+                except Exception as e:
+                    tqdm.write(f"❌ Ошибка синтеза для {[self.dataset[job[0]]['id'] for job in batch]}: {e}")
+                    results = [False] * len(batch)
                 
-            except Exception as e:
-                print(f"\n❌ Ошибка синтеза для {item_id}: {e}")
-                item['audio_path'] = None
-                item['audio_synthesized'] = False
-                fail_count += 1
+                # Обновляем записи в датасете (порядок датасета не меняется)
+                for (idx, _, audio_path, _), success in zip(batch, results):
+                    item = self.dataset[idx]
+                    item['audio_path'] = audio_path if success else None
+                    item['audio_synthesized'] = success
+                
+                self._record_progress(previous_batch, progress_file)
+                previous_batch = [self.dataset[idx] for idx, _, _, _ in batch]
+                
+                progress.update(len(batch))
             
-            updated_dataset.append(item)
+            # Дожидаемся записи оставшихся файлов до сохранения датасета
+            self._record_progress(previous_batch, progress_file)
+        
+        if world_size == 1:
+            self._save_dataset([progress_path])
+    
+    def merge_shards(self, world_size: int) -> None:
+        """
+        Собрать итоговый датасет из журналов процессов.
+        
+        Args:
+            world_size: Количество процессов.
+        """
+        progress_paths = [self._progress_path(rank, world_size) for rank in range(world_size)]
+        
+        done = {}
+        for progress_path in progress_paths:
+            done.update(self._load_progress(progress_path))
+        
+        for item in self.dataset:
+            previous = done.get(item['id'])
+            item['audio_path'] = previous['audio_path'] if previous else None
+            item['audio_synthesized'] = previous is not None
+        
+        self._save_dataset(progress_paths)
+    
+    def _save_dataset(self, progress_paths: List[Path]) -> None:
+        """
+        Сохранить датасет с аудио и удалить журналы прогресса.
+        
+        Args:
+            progress_paths: Журналы прогресса, которые больше не нужны.
+        """
+        updated_dataset = self.dataset
+        output_path = self.output_path
         
         # Сохраняем обновленный датасет
-        output_path = self.dataset_path.parent / f"{self.dataset_path.stem}_with_audio.json"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(updated_dataset, f, ensure_ascii=False, indent=2)
+        output_path.write_bytes(orjson.dumps(updated_dataset, option=orjson.OPT_INDENT_2))
+        
+        # Датасет сохранён целиком, журналы прогресса больше не нужны
+        for progress_path in progress_paths:
+            progress_path.unlink(missing_ok=True)
+        
+        success_count = sum(1 for item in updated_dataset if item.get('audio_synthesized'))
+        fail_count = len(updated_dataset) - success_count
         
         # Статистика
         print(f"\n{'='*60}")
@@ -220,6 +565,28 @@ class AudioSynthesizer:
 
 
 # ANCHOR:main
+def _synthesize_shard(
+    rank: int,
+    world_size: int,
+    synthesizer_kwargs: Dict,
+    synthesize_kwargs: Dict
+) -> None:
+    """
+    Синтезировать долю датасета в отдельном процессе на устройстве cuda:rank.
+    
+    Args:
+        rank: Номер процесса (и GPU).
+        world_size: Количество процессов.
+        synthesizer_kwargs: Аргументы AudioSynthesizer.
+        synthesize_kwargs: Аргументы synthesize_all.
+    """
+    # Текущее устройство процесса - его GPU: иначе empty_cache и контекст CUDA
+    # по умолчанию приходятся на cuda:0
+    torch.cuda.set_device(rank)
+    synthesizer = AudioSynthesizer(device=f"cuda:{rank}", **synthesizer_kwargs)
+    synthesizer.synthesize_all(rank=rank, world_size=world_size, **synthesize_kwargs)
+
+
 def main():
     """Главная функция."""
     parser = argparse.ArgumentParser(description="Синтез аудио для датасета")
@@ -252,19 +619,67 @@ def main():
         action="store_true",
         help="Не чередовать голоса"
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="Количество текстов в одном вызове TTS модели"
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Компилировать TTS модель через torch.compile (долгий старт)"
+    )
+    parser.add_argument(
+        "--attn-implementation",
+        type=str,
+        default=None,
+        help="Реализация внимания (например, flash_attention_2 или sdpa)"
+    )
+    parser.add_argument(
+        "--quantization",
+        type=str,
+        choices=["8bit", "4bit"],
+        default=None,
+        help="Квантизация весов TTS модели через bitsandbytes"
+    )
+    
+    parser.add_argument(
+        "--world-size",
+        type=int,
+        default=1,
+        help="Количество GPU (по процессу на устройство cuda:N)"
+    )
     
     args = parser.parse_args()
     
-    # Создаем синтезатор с Qwen3-TTS
-    synthesizer = AudioSynthesizer(
+    synthesizer_kwargs = dict(
         dataset_path=args.input,
         output_dir=args.output,
         model_name=args.model,
-        device=args.device,
+        compile_model=args.compile,
+        attn_implementation=args.attn_implementation,
+        quantization=args.quantization,
     )
+    synthesize_kwargs = dict(
+        alternate_speakers=not args.no_alternate_speakers,
+        batch_size=args.batch_size,
+    )
+    
+    if args.world_size > 1:
+        # Каждый процесс синтезирует свою долю датасета на своей GPU
+        torch.multiprocessing.spawn(
+            _synthesize_shard,
+            args=(args.world_size, synthesizer_kwargs, synthesize_kwargs),
+            nprocs=args.world_size
+        )
+        AudioSynthesizer(**synthesizer_kwargs).merge_shards(args.world_size)
+    else:
+        # Создаем синтезатор с Qwen3-TTS
+        synthesizer = AudioSynthesizer(device=args.device, **synthesizer_kwargs)
         
-    # Синтезируем аудио
-    synthesizer.synthesize_all(alternate_speakers=not args.no_alternate_speakers)
+        # Синтезируем аудио
+        synthesizer.synthesize_all(**synthesize_kwargs)
     
     print("\nГотово!")
 
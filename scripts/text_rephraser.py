@@ -4,9 +4,10 @@
 
 import asyncio
 import re
-from typing import List, Optional, Dict
+from typing import Any, Awaitable, Callable, List, Optional, Dict, Match, Pattern, Tuple
 from pathlib import Path
-import json
+
+import orjson
 
 
 # ANCHOR:prompts
@@ -41,6 +42,9 @@ REPHRASE_PROMPT = """Ты - эксперт по русскому языку. Т
 {text}
 
 Верни ТОЛЬКО исправленный текст, без объяснений."""
+
+# Части промпта вокруг текста: склейка вместо разбора шаблона format на каждый вызов
+REPHRASE_PROMPT_PREFIX, REPHRASE_PROMPT_SUFFIX = REPHRASE_PROMPT.split("{text}")
 # END:prompts
 
 
@@ -63,8 +67,14 @@ class TextRephraser:
             use_cache: Использовать ли кэш.
         """
         self.llm = llm_provider
+        # Способ вызова LLM определяется один раз, а не на каждый текст
+        self._call_llm = self._resolve_llm_call(llm_provider)
         self.use_cache = use_cache
         self.cache: Dict[str, str] = {}
+        # Запросы к LLM в процессе выполнения (текст -> задача)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Новые записи кэша, ещё не сохранённые в файл
+        self._unsaved = 0
         
         if cache_file:
             self.cache_file = Path(cache_file)
@@ -72,24 +82,58 @@ class TextRephraser:
         else:
             self.cache_file = None
     
+    @staticmethod
+    def _resolve_llm_call(llm) -> Optional[Callable[[str], Awaitable[Any]]]:
+        """
+        Выбрать метод провайдера для запроса к LLM.
+        
+        Args:
+            llm: Провайдер LLM.
+            
+        Returns:
+            Корутинная функция prompt -> ответ или None, если метод не найден.
+        """
+        if hasattr(llm, 'complete'):
+            def call(prompt: str) -> Awaitable[Any]:
+                return llm.complete(
+                    prompt=prompt,
+                    max_tokens=200,
+                    temperature=0.3  # Низкая температура для стабильности
+                )
+            return call
+        
+        if hasattr(llm, 'chat'):
+            # Альтернативный метод для chat-based API
+            def call(prompt: str) -> Awaitable[Any]:
+                return llm.chat(
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=200,
+                    temperature=0.3
+                )
+            return call
+        
+        return None
+    
     def _load_cache(self):
         """Загрузить кэш из файла."""
         if self.cache_file and self.cache_file.exists():
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    self.cache = json.load(f)
+                self.cache = orjson.loads(self.cache_file.read_bytes())
                 print(f"✓ Загружен кэш: {len(self.cache)} записей")
             except Exception as e:
                 print(f"⚠️  Ошибка загрузки кэша: {e}")
                 self.cache = {}
     
     def _save_cache(self):
-        """Сохранить кэш в файл."""
-        if self.cache_file:
+        """Сохранить кэш в файл (только если появились новые записи)."""
+        if self.cache_file and self._unsaved:
             try:
                 self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-                with open(self.cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.cache, f, ensure_ascii=False, indent=2)
+                # Пишем во временный файл и подменяем: сбой во время записи не портит кэш
+                tmp_path = self.cache_file.with_name(self.cache_file.name + '.tmp')
+                tmp_path.write_bytes(orjson.dumps(self.cache, option=orjson.OPT_INDENT_2))
+                tmp_path.replace(self.cache_file)
+                self._unsaved = 0
             except Exception as e:
                 print(f"⚠️  Ошибка сохранения кэша: {e}")
     
@@ -111,26 +155,37 @@ class TextRephraser:
         if not self.llm:
             return text
         
+        # Тот же текст уже запрошен другой задачей - ждём её ответа
+        inflight = self._inflight.get(text)
+        if inflight is not None:
+            return await inflight
+        
+        task = asyncio.ensure_future(self._request(text))
+        self._inflight[text] = task
         try:
-            prompt = REPHRASE_PROMPT.format(text=text)
+            return await task
+        finally:
+            self._inflight.pop(text, None)
+    
+    async def _request(self, text: str) -> str:
+        """
+        Запросить исправленный текст у LLM.
+        
+        Args:
+            text: Исходный текст с возможными ошибками.
+            
+        Returns:
+            Исправленный текст (исходный при ошибке).
+        """
+        # Fallback: провайдер без поддерживаемого метода
+        if self._call_llm is None:
+            return text
+        
+        try:
+            prompt = REPHRASE_PROMPT_PREFIX + text + REPHRASE_PROMPT_SUFFIX
             
             # Вызываем LLM
-            if hasattr(self.llm, 'complete'):
-                response = await self.llm.complete(
-                    prompt=prompt,
-                    max_tokens=200,
-                    temperature=0.3  # Низкая температура для стабильности
-                )
-            elif hasattr(self.llm, 'chat'):
-                # Альтернативный метод для chat-based API
-                response = await self.llm.chat(
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=200,
-                    temperature=0.3
-                )
-            else:
-                # Fallback
-                return text
+            response = await self._call_llm(prompt)
             
             # Извлекаем текст из ответа
             if isinstance(response, dict):
@@ -143,6 +198,7 @@ class TextRephraser:
             # Сохраняем в кэш
             if self.use_cache:
                 self.cache[text] = rephrased
+                self._unsaved += 1
             
             return rephrased
             
@@ -155,33 +211,49 @@ class TextRephraser:
         self,
         texts: List[str],
         batch_size: int = 10,
-        show_progress: bool = True
+        show_progress: bool = True,
+        save_every: int = 100,
+        semaphore: Optional[asyncio.Semaphore] = None
     ) -> List[str]:
         """
-        Перефразировать тексты батчами.
+        Перефразировать тексты с ограниченным параллелизмом.
         
         Args:
             texts: Список текстов.
-            batch_size: Размер батча.
+            batch_size: Максимальное число одновременных запросов к LLM.
             show_progress: Показывать прогресс.
+            save_every: Сохранять кэш каждые N перефразированных текстов.
+            semaphore: Общий семафор с другими батчами, идущими одновременно
+                (по умолчанию свой на batch_size запросов).
             
         Returns:
-            Список перефразированных текстов.
+            Список перефразированных текстов в исходном порядке.
         """
-        results = []
-        total = len(texts)
+        # Повторяющиеся тексты перефразируем один раз
+        unique_texts = list(dict.fromkeys(texts))
+        total = len(unique_texts)
+        done = 0
+        # Семафор вместо фиксированных батчей: следующий запрос уходит,
+        # как только освобождается слот, а не после самого медленного в батче
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(batch_size)
         
-        for i in range(0, total, batch_size):
-            batch = texts[i:i+batch_size]
-            
-            # Параллельная обработка батча
-            tasks = [self.rephrase(text) for text in batch]
-            batch_results = await asyncio.gather(*tasks)
-            
-            results.extend(batch_results)
-            
-            if show_progress:
-                print(f"\rПерефразировано: {len(results)}/{total}", end="")
+        async def rephrase_one(text: str) -> str:
+            nonlocal done
+            async with semaphore:
+                result = await self.rephrase(text)
+            done += 1
+            if show_progress and (done % batch_size == 0 or done == total):
+                print(f"\rПерефразировано: {done}/{total}", end="")
+            # Промежуточное сохранение: при сбое не теряем уже оплаченные ответы.
+            # _save_cache синхронный, поэтому другие задачи не вклиниваются в запись
+            if self.use_cache and done % save_every == 0:
+                self._save_cache()
+            return result
+        
+        rephrased = await asyncio.gather(*(rephrase_one(text) for text in unique_texts))
+        mapping = dict(zip(unique_texts, rephrased))
+        results = [mapping[text] for text in texts]
         
         if show_progress:
             print()  # Новая строка
@@ -246,6 +318,64 @@ class SimpleRephraser:
             "Пермь": "Пермь",
             "Воронеж": "Воронеж"
         }
+        
+        # Исправления дней недели после "на"
+        self.weekday_corrections = {
+            "понедельник": "в понедельник",
+            "вторник": "во вторник",
+            "среда": "в среду",
+            "четверг": "в четверг",
+            "пятница": "в пятницу",
+            "суббота": "в субботу",
+            "воскресенье": "в воскресенье",
+        }
+        
+        # Все правила в одном регулярном выражении: строка просматривается
+        # один раз, сколько бы городов и предлогов ни было в словарях
+        self._pattern, self._lookups = self._compile_rules([
+            # Города после "из" (родительный падеж)
+            ("из", {
+                city: f"из {genitive}" for city, genitive in self.cities_genitive.items()
+            }),
+            # Города после "в" (винительный падеж)
+            ("в", {
+                city: f"в {accusative}" for city, accusative in self.cities_accusative.items()
+            }),
+            # Дни недели
+            ("на", self.weekday_corrections),
+        ])
+    
+    @staticmethod
+    def _compile_rules(
+        rules: List[Tuple[str, Dict[str, str]]]
+    ) -> Tuple[Pattern, List[Dict[str, str]]]:
+        """
+        Собрать правила вида "<предлог> <слово>" -> замена в одно выражение.
+        
+        Args:
+            rules: Пары (предлог, словарь слово -> текст замены всего совпадения).
+            
+        Returns:
+            Скомпилированное выражение (группа i соответствует правилу i)
+            и словари замен по слову в нижнем регистре.
+        """
+        alternatives = []
+        lookups = []
+        for prefix, replacements in rules:
+            # Длинные слова первыми, чтобы альтернатива не останавливалась на префиксе
+            words = sorted(replacements, key=len, reverse=True)
+            alternatives.append(rf'{prefix} ({"|".join(map(re.escape, words))})')
+            lookups.append({word.lower(): replacement for word, replacement in replacements.items()})
+        pattern = re.compile(
+            rf'\b(?:{"|".join(alternatives)})\b',
+            flags=re.IGNORECASE
+        )
+        return pattern, lookups
+    
+    def _replace(self, match: Match) -> str:
+        """Замена для совпадения: правило определяется номером сработавшей группы."""
+        group = match.lastindex
+        return self._lookups[group - 1][match.group(group).lower()]
     
     async def rephrase(self, text: str) -> str:
         """
@@ -257,53 +387,30 @@ class SimpleRephraser:
         Returns:
             Исправленный текст.
         """
-        result = text
-        
-        # Исправляем города после "из" (родительный падеж)
-        for city, genitive in self.cities_genitive.items():
-            result = re.sub(
-                rf'\bиз {city}\b',
-                f'из {genitive}',
-                result,
-                flags=re.IGNORECASE
-            )
-        
-        # Исправляем города после "в" (винительный падеж)
-        for city, accusative in self.cities_accusative.items():
-            result = re.sub(
-                rf'\bв {city}\b',
-                f'в {accusative}',
-                result,
-                flags=re.IGNORECASE
-            )
-        
-        # Исправляем дни недели
-        weekday_corrections = {
-            r'\bна понедельник\b': 'в понедельник',
-            r'\bна вторник\b': 'во вторник',
-            r'\bна среда\b': 'в среду',
-            r'\bна четверг\b': 'в четверг',
-            r'\bна пятница\b': 'в пятницу',
-            r'\bна суббота\b': 'в субботу',
-            r'\bна воскресенье\b': 'в воскресенье',
-        }
-        
-        for pattern, replacement in weekday_corrections.items():
-            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
+        return self.rephrase_sync(text)
+    
+    def rephrase_sync(self, text: str) -> str:
+        """
+        Перефразировать текст по правилам (синхронно, без цикла событий).
         
-        return result
+        Args:
+            text: Исходный текст.
+            
+        Returns:
+            Исправленный текст.
+        """
+        return self._pattern.sub(self._replace, text)
     
     async def rephrase_batch(
         self,
         texts: List[str],
         batch_size: int = 10,
-        show_progress: bool = True
+        show_progress: bool = True,
+        semaphore: Optional[asyncio.Semaphore] = None
     ) -> List[str]:
         """Перефразировать батч текстов."""
-        results = []
-        for text in texts:
-            results.append(await self.rephrase(text))
-        return results
+        # Правила не требуют ожидания: без корутины на каждый текст
+        return [self.rephrase_sync(text) for text in texts]
 # END:simple_rephraser
 
 
@@ -2,6 +2,10 @@
 Модуль SGR агента.
 """
 
+from typing import Optional
+
+import httpx
+
 from src.agent.sgr_agent import SGRAgent
 from src.agent.schemas import AgentStep
 from src.agent.prompts import get_system_prompt
@@ -10,10 +14,13 @@ from src.tools import ToolDispatcher, register_all_tools
 from src.core.config import get_config
 
 
-def create_agent() -> SGRAgent:
+def create_agent(http_client: Optional[httpx.AsyncClient] = None) -> SGRAgent:
     """
     Создать и инициализировать SGR агента со всеми зависимостями.
     
+    Args:
+        http_client: Общий HTTP клиент для обращений к LLM.
+        
     Returns:
         Инициализированный SGR агент.
     """
@@ -21,7 +28,7 @@ def create_agent() -> SGRAgent:
     config = get_config()
     
     # Создаем LLM провайдер через фабрику
-    llm_provider = create_llm_provider(config.llm)
+    llm_provider = create_llm_provider(config.llm, http_client=http_client)
     
     # Регистрируем все инструменты
     registry = register_all_tools()
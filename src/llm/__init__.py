@@ -4,9 +4,22 @@
 
 from src.llm.provider import LLMProvider
 from src.llm.openai_provider import OpenAILLMProvider
-from src.llm.local_provider import LocalLLMProvider
 from src.llm.factory import create_llm_provider
 
+
+def __getattr__(name: str):
+    """
+    Импортировать LocalLLMProvider при первом обращении.
+    
+    Локальный провайдер тянет transformers, torch и xgrammar (секунды
+    на импорт), которые не нужны при работе через OpenAI-совместимый API.
+    """
+    if name == "LocalLLMProvider":
+        from src.llm.local_provider import LocalLLMProvider
+        return LocalLLMProvider
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     "LLMProvider",
     "OpenAILLMProvider",
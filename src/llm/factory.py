@@ -2,9 +2,12 @@
 Фабрика для создания LLM провайдеров.
 """
 
+from typing import Optional
+
+import httpx
+
 from src.llm.provider import LLMProvider
 from src.llm.openai_provider import OpenAILLMProvider
-from src.llm.local_provider import LocalLLMProvider
 from src.core.config import LLMConfig
 from src.core.logger import get_module_logger
 
@@ -13,12 +16,16 @@ logger = get_module_logger(__name__)
 
 
 # ANCHOR:llm_provider_factory
-def create_llm_provider(config: LLMConfig) -> LLMProvider:
+def create_llm_provider(
+    config: LLMConfig,
+    http_client: Optional[httpx.AsyncClient] = None
+) -> LLMProvider:
     """
     Создать LLM провайдер на основе конфигурации.
     
     Args:
         config: Конфигурация LLM.
+        http_client: Общий HTTP клиент для удаленных провайдеров.
         
     Returns:
         Экземпляр LLM провайдера.
@@ -30,9 +37,11 @@ def create_llm_provider(config: LLMConfig) -> LLMProvider:
     
     if provider_type == "openai":
         logger.info(f"Creating OpenAI LLM provider with model: {config.model}")
-        return OpenAILLMProvider(config)
+        return OpenAILLMProvider(config, http_client=http_client)
     elif provider_type == "local":
         logger.info(f"Creating Local LLM provider with model: {config.model}")
+        # Импорт здесь: transformers и torch нужны только локальному провайдеру
+        from src.llm.local_provider import LocalLLMProvider
         return LocalLLMProvider(config)
     else:
         raise ValueError(
@@ -3,7 +3,9 @@ LLM провайдер на основе OpenAI клиента.
 Работает с vLLM, OpenRouter и другими OpenAI-совместимыми API.
 """
 
-from typing import List, Dict, Any, Type
+from typing import List, Dict, Any, Optional, Type
+
+import httpx
 from pydantic import BaseModel
 from openai import AsyncOpenAI
 
@@ -22,19 +24,22 @@ class OpenAILLMProvider(LLMProvider):
     Поддерживает vLLM, OpenRouter и другие OpenAI-совместимые API.
     """
     
-    def __init__(self, config: LLMConfig):
+    def __init__(self, config: LLMConfig, http_client: Optional[httpx.AsyncClient] = None):
         """
         Инициализация провайдера.
         
         Args:
             config: Конфигурация LLM.
+            http_client: Общий HTTP клиент. Позволяет переиспользовать пул
+                соединений между провайдерами; закрывает его владелец.
         """
         self.config = config
         
         # Создаем асинхронный клиент
         self.async_client = AsyncOpenAI(
             base_url=config.base_url,
-            api_key=config.api_key
+            api_key=config.api_key,
+            http_client=http_client
         )
         
         logger.info(f"OpenAI LLM Provider initialized with base_url: {config.base_url}, model: {config.model}")
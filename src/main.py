@@ -10,13 +10,12 @@ from src.core.logger import setup_logger
 from src.core.config import get_config
 
 
-# Загружаем переменные окружения
-load_dotenv()
-
-
 # ANCHOR:main
 def main():
     """Главная функция приложения."""
+    # Загружаем переменные окружения (только при запуске, не при импорте модуля)
+    load_dotenv()
+    
     # Парсим аргументы командной строки
     parser = argparse.ArgumentParser(description="Audio Router - Голосовой помощник")
     parser.add_argument(
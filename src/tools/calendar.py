@@ -4,8 +4,9 @@
 Поддерживает относительные даты и периоды.
 """
 
-from typing import Dict, Any, Type, List, Optional
+from typing import Dict, Any, Type, List, Optional, Tuple
 import csv
+from collections import defaultdict
 from datetime import datetime
 
 from src.tools.base import Tool, BaseTool
@@ -35,6 +36,10 @@ class CalendarTool(Tool):
         # Инициализируем парсер дат
         self.date_parser = DateParser()
         
+        # События с индексом по дате и отметка файла (mtime, размер), по которой они прочитаны
+        self._events_cache: Optional[Tuple[Tuple[Dict[str, str], ...], Dict[str, Tuple[Dict[str, str], ...]]]] = None
+        self._events_stamp: Optional[Tuple[int, int]] = None
+        
         # Создаем файл если не существует
         self._ensure_file_exists()
     
@@ -61,6 +66,33 @@ class CalendarTool(Tool):
                 events.append(row)
         return events
     
+    def _load_events(self) -> Tuple[Tuple[Dict[str, str], ...], Dict[str, Tuple[Dict[str, str], ...]]]:
+        """
+        Получить все события и индекс событий по дате.
+        
+        Файл перечитывается только если изменился с прошлого чтения
+        (в него может писать и другой экземпляр инструмента).
+        
+        Кэш хранится в кортежах и не должен попадать к вызывающему коду:
+        события отдаются наружу только копиями.
+        
+        Returns:
+            Кортеж событий и словарь дата -> события этой даты.
+        """
+        stat = self.file_path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if self._events_cache is None or stamp != self._events_stamp:
+            events = self._read_events()
+            events_by_date = defaultdict(list)
+            for event in events:
+                events_by_date[event['date']].append(event)
+            self._events_cache = (
+                tuple(events),
+                {date: tuple(items) for date, items in events_by_date.items()}
+            )
+            self._events_stamp = stamp
+        return self._events_cache
+    
     def _write_event(self, date: str, description: str):
         """
         Добавить событие в календарь.
@@ -249,36 +281,37 @@ class GetCalendarEventsToolImpl(CalendarTool):
                     }
             
             # Читаем все события
-            all_events = self._read_events()
+            all_events, events_by_date = self._load_events()
             
             # Фильтруем события
             filtered_events = []
             
-            for event in all_events:
-                event_date = event['date']
-                
-                # Фильтр по конкретной дате
-                if params.date:
-                    if event_date == params.date:
-                        filtered_events.append(event)
-                # Фильтр по периоду
-                elif params.date_from and params.date_to:
-                    if params.date_from <= event_date <= params.date_to:
-                        filtered_events.append(event)
-                # Фильтр только по началу периода
-                elif params.date_from:
-                    if event_date >= params.date_from:
-                        filtered_events.append(event)
-                # Фильтр только по концу периода
-                elif params.date_to:
-                    if event_date <= params.date_to:
+            # Фильтр по конкретной дате - выборка по индексу без просмотра всех событий
+            if params.date:
+                filtered_events.extend(events_by_date.get(params.date, ()))
+            else:
+                for event in all_events:
+                    event_date = event['date']
+                    
+                    # Фильтр по периоду
+                    if params.date_from and params.date_to:
+                        if params.date_from <= event_date <= params.date_to:
+                            filtered_events.append(event)
+                    # Фильтр только по началу периода
+                    elif params.date_from:
+                        if event_date >= params.date_from:
+                            filtered_events.append(event)
+                    # Фильтр только по концу периода
+                    elif params.date_to:
+                        if event_date <= params.date_to:
+                            filtered_events.append(event)
+                    # Без фильтров - все события
+                    else:
                         filtered_events.append(event)
-                # Без фильтров - все события
-                else:
-                    filtered_events.append(event)
             
-            # Сортируем по дате
+            # Сортируем по дате; копируем события, чтобы изменения результата не попали в кэш
             filtered_events.sort(key=lambda x: x['date'])
+            filtered_events = [dict(event) for event in filtered_events]
             
             return {
                 "success": True,
@@ -0,0 +1,92 @@
+"""
+Unit-тесты для инструментов календаря.
+"""
+
+import pytest
+from src.tools.calendar import AddCalendarEventToolImpl, GetCalendarEventsToolImpl
+from src.tools.schemas import AddCalendarEventTool, GetCalendarEventsTool
+from src.core.config import CalendarToolConfig
+
+
+# ANCHOR:test_calendar_fixtures
+@pytest.fixture
+def calendar_config(tmp_path):
+    """Фикстура конфигурации с временным файлом календаря."""
+    return CalendarToolConfig(file_path=str(tmp_path / "calendar.csv"))
+
+
+@pytest.fixture
+def add_tool(calendar_config):
+    """Фикстура инструмента добавления событий."""
+    return AddCalendarEventToolImpl(calendar_config)
+
+
+@pytest.fixture
+def get_tool(calendar_config):
+    """Фикстура инструмента получения событий."""
+    return GetCalendarEventsToolImpl(calendar_config)
+
+
+async def add_event(tool, date: str, description: str):
+    """Добавить событие через инструмент."""
+    return await tool.execute(AddCalendarEventTool(
+        tool="add_calendar_event",
+        date=date,
+        description=description
+    ))
+
+
+async def get_events(tool, **filters):
+    """Получить описания событий через инструмент."""
+    result = await tool.execute(GetCalendarEventsTool(tool="get_calendar_events", **filters))
+    assert result["success"] is True
+    return [event["description"] for event in result["events"]]
+# END:test_calendar_fixtures
+
+
+# ANCHOR:test_calendar_get_events
+@pytest.mark.asyncio
+async def test_get_events_by_date(add_tool, get_tool):
+    """Тест выборки событий по конкретной дате."""
+    await add_event(add_tool, "2030-01-05", "Встреча")
+    await add_event(add_tool, "2030-01-03", "Звонок")
+    await add_event(add_tool, "2030-01-05", "Ужин")
+
+    assert await get_events(get_tool, date="2030-01-05") == ["Встреча", "Ужин"]
+    assert await get_events(get_tool, date="2030-01-04") == []
+
+
+@pytest.mark.asyncio
+async def test_get_events_by_period(add_tool, get_tool):
+    """Тест выборки событий за период."""
+    await add_event(add_tool, "2030-01-05", "Встреча")
+    await add_event(add_tool, "2030-01-03", "Звонок")
+
+    assert await get_events(get_tool, date_from="2030-01-01", date_to="2030-01-04") == ["Звонок"]
+    assert await get_events(get_tool) == ["Звонок", "Встреча"]
+
+
+@pytest.mark.asyncio
+async def test_get_events_sees_new_events(add_tool, get_tool):
+    """Тест: события, добавленные другим экземпляром, видны после чтения."""
+    await add_event(add_tool, "2030-01-05", "Встреча")
+    assert await get_events(get_tool, date="2030-01-05") == ["Встреча"]
+
+    await add_event(add_tool, "2030-01-05", "Ужин")
+    assert await get_events(get_tool, date="2030-01-05") == ["Встреча", "Ужин"]
+# END:test_calendar_get_events
+
+
+# ANCHOR:test_calendar_cache
+@pytest.mark.asyncio
+async def test_get_events_result_does_not_change_cache(add_tool, get_tool):
+    """Тест: изменение результата не влияет на следующие запросы."""
+    await add_event(add_tool, "2030-01-05", "Встреча")
+
+    result = await get_tool.execute(GetCalendarEventsTool(tool="get_calendar_events", date="2030-01-05"))
+    result["events"][0]["description"] = "Изменено"
+    result["events"].clear()
+
+    assert await get_events(get_tool, date="2030-01-05") == ["Встреча"]
+    assert await get_events(get_tool) == ["Встреча"]
+# END:test_calendar_cache
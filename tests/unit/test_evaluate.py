@@ -0,0 +1,96 @@
+"""
+Тесты кэша результатов оценки.
+"""
+
+import json
+
+import pytest
+from unittest.mock import AsyncMock
+
+from scripts.evaluate import MetricsCalculator
+
+
+SAMPLE = {"id": "s1", "text": "Включи Кино", "tool": "search_music"}
+
+
+# ANCHOR:test_evaluate_fixtures
+@pytest.fixture
+def calculator(tmp_path):
+    """Калькулятор с одним примером и временным файлом кэша."""
+    dataset_path = tmp_path / "dataset.json"
+    dataset_path.write_text(json.dumps([SAMPLE]), encoding="utf-8")
+    return MetricsCalculator(str(dataset_path), cache_file=str(tmp_path / ".eval_cache.json"))
+
+
+def make_agent(result):
+    """Агент, возвращающий заданный результат."""
+    agent = AsyncMock()
+    agent.process_request.return_value = result
+    return agent
+
+
+def make_result(sample_id, expected_tool, predicted_tool):
+    """Результат оценки одного примера."""
+    return {
+        "id": sample_id,
+        "expected_tool": expected_tool,
+        "predicted_tool": predicted_tool,
+        "correct_tool": predicted_tool == expected_tool,
+        "parsable": predicted_tool is not None,
+        "success": True,
+        "steps": 1
+    }
+# END:test_evaluate_fixtures
+
+
+# ANCHOR:test_evaluate_cache
+@pytest.mark.asyncio
+async def test_successful_result_is_cached(calculator):
+    """Тест: успешный ответ агента берется из кэша при повторной оценке."""
+    calculator.agent = make_agent({"success": True, "steps": [{"tool": "search_music"}]})
+
+    first = await calculator.evaluate_sample_text(SAMPLE)
+    second = await calculator.evaluate_sample_text(SAMPLE)
+
+    assert calculator.agent.process_request.await_count == 1
+    assert first["correct_tool"] is True
+    assert second["predicted_tool"] == "search_music"
+    assert len(calculator.cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_result_is_not_cached(calculator):
+    """Тест: ошибка агента (например, сбой сети) не попадает в кэш."""
+    calculator.agent = make_agent({"success": False, "error": "Connection error", "steps": []})
+
+    result = await calculator.evaluate_sample_text(SAMPLE)
+    assert result["success"] is False
+    assert calculator.cache == {}
+
+    calculator.agent.process_request.return_value = {"success": True, "steps": [{"tool": "search_music"}]}
+    result = await calculator.evaluate_sample_text(SAMPLE)
+
+    assert calculator.agent.process_request.await_count == 2
+    assert result["correct_tool"] is True
+# END:test_evaluate_cache
+
+
+# ANCHOR:test_evaluate_modality_gap
+def test_modality_gap_uses_assigned_audio_results(calculator):
+    """Тест: согласие и деградация считаются по результатам, заданным без оценки."""
+    calculator.text_results = [
+        make_result("s1", "search_music", "search_music"),
+        make_result("s2", "get_weather", "get_weather"),
+    ]
+    calculator.audio_results = [
+        make_result("s1", "search_music", "search_music"),
+        make_result("s2", "get_weather", None),
+    ]
+
+    text_metrics = calculator.calculate_metrics(calculator.text_results)
+    audio_metrics = calculator.calculate_metrics(calculator.audio_results)
+    overall = calculator.calculate_modality_gap(text_metrics, audio_metrics)["overall"]
+
+    assert overall["tool_agreement_rate"] == 0.5
+    assert overall["degradation_rate"] == 0.5
+# END:test_evaluate_modality_gap
@@ -2,6 +2,7 @@
 Тесты для фабрики LLM провайдеров.
 """
 
+import httpx
 import pytest
 from unittest.mock import patch, MagicMock
 
@@ -124,3 +125,19 @@ def test_openai_provider_uppercase():
     
     assert isinstance(provider, OpenAILLMProvider)
 # END:test_openai_provider_uppercase
+
+
+# ANCHOR:test_openai_provider_shared_http_client
+@patch.dict('os.environ', {'LLM_BASE_URL': 'http://test.com', 'LLM_API_KEY': 'test_key'})
+def test_openai_provider_shared_http_client():
+    """Тест передачи общего HTTP клиента в OpenAI провайдер."""
+    config = LLMConfig(
+        provider="openai",
+        model="test-model"
+    )
+    http_client = httpx.AsyncClient()
+    
+    provider = create_llm_provider(config, http_client=http_client)
+    
+    assert provider.async_client._client is http_client
+# END:test_openai_provider_shared_http_client
@@ -0,0 +1,79 @@
+"""
+Тесты для OpenAI LLM провайдера.
+"""
+
+import json
+
+import httpx
+import pytest
+from unittest.mock import patch
+from openai import LengthFinishReasonError
+
+from src.llm.openai_provider import OpenAILLMProvider
+from src.agent.schemas import AgentStep
+from src.core.config import LLMConfig
+
+
+AGENT_STEP = {
+    "current_state": "Пользователь хочет найти музыку",
+    "tool_required": True,
+    "plan": ["Найти трек"],
+    "task_completed": False,
+    "next_action": {"tool": "search_music", "query": "Кино"}
+}
+
+
+# ANCHOR:test_openai_provider_fixtures
+def make_provider(message, finish_reason="stop", requests=None):
+    """Создать провайдер, отвечающий заданным сообщением без обращения к сети."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if requests is not None:
+            requests.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": "test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test-model",
+            "choices": [{
+                "index": 0,
+                "finish_reason": finish_reason,
+                "message": {"role": "assistant", **message}
+            }]
+        })
+
+    with patch.dict('os.environ', {'LLM_BASE_URL': 'http://test.com', 'LLM_API_KEY': 'test_key'}):
+        return OpenAILLMProvider(
+            LLMConfig(provider="openai", model="test-model"),
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+# END:test_openai_provider_fixtures
+
+
+# ANCHOR:test_openai_provider_generate
+@pytest.mark.asyncio
+async def test_generate_structured_parses_response():
+    """Тест разбора структурированного ответа."""
+    requests = []
+    provider = make_provider({"content": json.dumps(AGENT_STEP)}, requests=requests)
+
+    result = await provider.generate_structured([{"role": "user", "content": "Включи Кино"}], AgentStep)
+
+    assert isinstance(result, AgentStep)
+    assert result.next_action.tool == "search_music"
+    assert result.next_action.query == "Кино"
+
+    response_format = requests[0]["response_format"]
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["name"] == "AgentStep"
+    assert response_format["json_schema"]["strict"] is True
+    assert response_format["json_schema"]["schema"]["additionalProperties"] is False
+
+
+@pytest.mark.asyncio
+async def test_generate_structured_length_finish():
+    """Тест: обрезанный по длине ответ дает понятную ошибку."""
+    provider = make_provider({"content": '{"current_state": "'}, finish_reason="length")
+
+    with pytest.raises(LengthFinishReasonError):
+        await provider.generate_structured([{"role": "user", "content": "Привет"}], AgentStep)
+# END:test_openai_provider_generate